@@ -0,0 +1,82 @@
+'''Time to load cached employers and jobs into an empty database.
+
+Runs offline. The cached items are copied from the pages in
+benchmarks/fixtures, every employer gets --jobs / --employers jobs:
+
+    python -m benchmarks.bulk_load --jobs 20000 --employers 2000
+
+The time per employer compares with the ORM path the loader replaced,
+166ms per employer when it was removed.
+'''
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+
+from benchmarks.cache_formats import make_items
+from itviec import create_app
+from itviec.bulk import load_employers
+from itviec.db import db
+from itviec.models import Job
+from itviec.store import get_store
+from tests.standin import cache_config
+
+
+def cache_items(jobs, employers):
+    '''Cache the items and return the employer codes'''
+    job_items, employer_items = make_items(jobs, employers)
+    employer_codes = list(employer_items)
+
+    for employer in employer_items.values():
+        employer["name"] = employer["code"]
+        employer["jobs"] = []
+    for i, job in enumerate(job_items.values()):
+        employer = employer_items[employer_codes[i % employers]]
+        job["employer_code"] = employer["code"]
+        employer["jobs"].append({key: job[key] for key in ("code", "title", "last_update", "last_post")})
+
+    get_store("jobs").put_many(job_items)
+    get_store("employers").put_many(employer_items)
+    return employer_codes
+
+
+def measure(load, employer_codes, cache_dir, name):
+    '''Seconds to load employer_codes with load into a new database'''
+    with app_database(cache_dir, name):
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            load(employer_codes)
+        elapsed = time.perf_counter() - start
+        jobs = Job.query.count()
+    return elapsed, jobs
+
+
+@contextlib.contextmanager
+def app_database(cache_dir, name):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        db.set_uri("sqlite:///" + os.path.join(cache_dir, name))
+        db.init_db()
+    yield
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading the cache into the database.")
+    parser.add_argument("--jobs", type=int, default=20000, help="cached jobs")
+    parser.add_argument("--employers", type=int, default=2000, help="cached employers")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        app = create_app(profile="testing", test_config=cache_config(cache_dir))
+
+        with app.app_context():
+            employer_codes = cache_items(args.jobs, args.employers)
+            bulk, bulk_jobs = measure(load_employers, employer_codes, cache_dir, "bulk.sqlite")
+
+    print("")
+    print("{} jobs, {} employers".format(args.jobs, args.employers))
+    print("bulk: {} jobs in {:.2f}s, {:.2f}ms per employer".format(bulk_jobs, bulk, bulk * 1000 / args.employers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+'''Size on disk, write time and load time of the jobs and employers cache in
+every CACHE_ENCODING and CACHE_BACKEND.
+
+Runs offline. The cached items are parsed from the pages in
+benchmarks/fixtures and copied under new codes:
+
+    python -m benchmarks.cache_formats --jobs 1000 --employers 200
+
+Data is the size of the encoded items, disk is the space the backend takes
+for them: file system blocks for the directory backend, and the database
+file, with the small metadata index, for the sqlite backend. Load time is
+the time to read and decode every item with get_many.
+'''
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.parsers import REVIEWS_URL, parse_employer, parse_job, read_fixture
+from itviec import create_app
+from itviec.encoding import ENCODINGS, get_encoding, orjson
+from itviec.parsers import EmployerParser
+from itviec.store import BACKENDS, make_store
+from tests.standin import cache_config
+
+
+def make_items(jobs, employers):
+    '''({code: job}, {code: employer}) copied from the fixture pages'''
+    job = parse_job(read_fixture("job_long_description.html"))
+
+    employer_p = EmployerParser("acme-software")
+    employer_p.emp = parse_employer(read_fixture("employer_large.html"))
+    employer_p.emp["reviews"] = []
+    employer_p.parse_reviews_page(REVIEWS_URL, read_fixture("reviews_large.html"))
+    employer = employer_p.emp
+
+    job_items = {"{}-{}".format(job["code"], i): dict(job, code="{}-{}".format(job["code"], i)) for i in range(jobs)}
+    employer_items = {"{}-{}".format(employer["code"], i): dict(employer, code="{}-{}".format(employer["code"], i))
+                      for i in range(employers)}
+    return job_items, employer_items
+
+
+def disk_size(store):
+    if hasattr(store, "directory"):
+        return sum(os.stat(store.path(code)).st_blocks * 512 for code in store.codes())
+
+    with store.db.connect() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(store.db.path)
+
+
+def measure(items, kind, backend, encoding, repeat):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        test_config = cache_config(cache_dir)
+        test_config.update({"CACHE_BACKEND": backend, "CACHE_ENCODING": encoding})
+        app = create_app(profile="testing", test_config=test_config)
+
+        with app.app_context():
+            store = make_store(kind)
+
+            start = time.perf_counter()
+            store.put_many(items)
+            write = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                store.get_many(items)
+            load = (time.perf_counter() - start) / repeat
+
+            data = sum(len(store.get_data(code)) for code in items)
+            disk = disk_size(store)
+
+    return {"data": data, "disk": disk, "write": write, "load": load}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cache encodings and backends.")
+    parser.add_argument("--jobs", type=int, default=1000, help="cached jobs")
+    parser.add_argument("--employers", type=int, default=200, help="cached employers")
+    parser.add_argument("--repeat", type=int, default=3, help="loads per case")
+    args = parser.parse_args()
+
+    app = create_app(profile="testing", test_config={"SQLALCHEMY_ECHO": False, "VERBOSE": False})
+    with app.app_context():
+        jobs, employers = make_items(args.jobs, args.employers)
+        encodings = [encoding for encoding in ENCODINGS if get_encoding(encoding) == encoding]
+
+    results = []
+    for backend in BACKENDS:
+        for encoding in encodings:
+            for kind, items in (("jobs", jobs), ("employers", employers)):
+                result = measure(items, kind, backend, encoding, args.repeat)
+                result.update({"backend": backend, "encoding": encoding, "kind": kind})
+                results.append(result)
+
+    print("")
+    print("{} jobs, {} employers, JSON with {}".format(args.jobs, args.employers, "orjson" if orjson else "json"))
+    print("{:<10} {:<11} {:<10} {:>9} {:>9} {:>9} {:>9}".format(
+        "backend", "encoding", "kind", "data MB", "disk MB", "write s", "load s"))
+    for result in results:
+        print("{:<10} {:<11} {:<10} {:>9.2f} {:>9.2f} {:>9.3f} {:>9.3f}".format(
+            result["backend"], result["encoding"], result["kind"], result["data"] / 2 ** 20,
+            result["disk"] / 2 ** 20, result["write"], result["load"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+'''Job card extraction time of JobTagParser and parse_job_cards on a 20 card feed page.
+
+The page is built from the cards of the recorded feed pages in tests/fixtures:
+
+    python -m benchmarks.job_cards [repeat] [cards]
+'''
+import json
+import sys
+import time
+
+from itviec import create_app
+from itviec.feeds import JobTagIterator
+from itviec.parsers import JobTagParser, parse_job_cards
+from itviec.soup import make_soup
+from tests.standin import load_routes
+
+
+def recorded_feed_page(cards):
+    '''jobs_html with the recorded feed cards repeated up to cards cards'''
+    routes = load_routes()
+    card_tags = []
+    for path in ("/it-jobs", "/it-jobs?page=2"):
+        soup = make_soup(json.loads(routes[path][0])["jobs_html"])
+        card_tags.extend(soup.find_all("div", class_="job", recursive=False))
+
+    return "\n".join(str(card_tags[i % len(card_tags)]) for i in range(cards))
+
+
+def job_tag_parser(jobs_html):
+    return [JobTagParser(job_tag).get_dict() for job_tag in JobTagIterator(jobs_html)]
+
+
+def time_parser(func, jobs_html, repeat):
+    '''Mean milliseconds per page, including building the tree, and the jobs'''
+    start = time.perf_counter()
+    for _ in range(repeat):
+        jobs = func(jobs_html)
+    return (time.perf_counter() - start) * 1000 / repeat, jobs
+
+
+def main(repeat=200, cards=20):
+    app = create_app(profile="testing", test_config={"SQLALCHEMY_ECHO": False, "VERBOSE": False})
+
+    with app.app_context():
+        jobs_html = recorded_feed_page(cards)
+        tree_ms, _ = time_parser(make_soup, jobs_html, repeat)
+        old_ms, expected = time_parser(job_tag_parser, jobs_html, repeat)
+        new_ms, jobs = time_parser(parse_job_cards, jobs_html, repeat)
+
+    if jobs != expected:
+        raise AssertionError("parse_job_cards output differs from JobTagParser")
+
+    print("{} cards per page, {} pages".format(cards, repeat))
+    print("{:<16} {:>10} {:>14}".format("parser", "ms/page", "ms w/o tree"))
+    print("{:<16} {:>10.2f} {:>14.2f}".format("JobTagParser", old_ms, old_ms - tree_ms))
+    print("{:<16} {:>10.2f} {:>14.2f}".format("parse_job_cards", new_ms, new_ms - tree_ms))
+    print("Speedup: {:.2f}x, {:.2f}x without building the tree".format(
+        old_ms / new_ms, (old_ms - tree_ms) / (new_ms - tree_ms)))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
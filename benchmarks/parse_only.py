@@ -0,0 +1,75 @@
+'''Per-page parse time of JobParser and EmployerParser with and without HTML_PARSE_ONLY.
+
+Runs offline on the recorded pages in tests/fixtures:
+
+    python -m benchmarks.parse_only [repeat]
+'''
+import sys
+import time
+
+from bs4.builder import builder_registry
+
+from itviec import create_app
+from itviec.parsers import EmployerParser, JobParser
+from itviec.soup import BACKENDS
+from tests.standin import load_routes
+
+
+def recorded_pages():
+    '''(parser class, code, html) for every recorded job and employer page'''
+    pages = []
+    for path, (body, _) in sorted(load_routes().items()):
+        parts = path.split("/")
+        if path.startswith("/it-jobs/"):
+            pages.append((JobParser, parts[2], body))
+        elif path.startswith("/companies/") and len(parts) == 3:
+            pages.append((EmployerParser, parts[2], body))
+    return pages
+
+
+def parse_page(parser_class, code, html):
+    if parser_class is JobParser:
+        return JobParser(code).parse_job_page(html)
+    return EmployerParser(code).parse_employer_page(html)
+
+
+def time_pages(pages, parser_class, repeat):
+    '''Mean milliseconds per page and the parsed dicts'''
+    selected = [page for page in pages if page[0] is parser_class]
+    results = []
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [parse_page(*page) for page in selected]
+    elapsed = time.perf_counter() - start
+
+    return elapsed * 1000 / (repeat * len(selected)), results
+
+
+def main(repeat=50):
+    app = create_app(profile="testing", test_config={"SQLALCHEMY_ECHO": False, "VERBOSE": False})
+    pages = recorded_pages()
+
+    print("{:<15} {:<12} {:>10} {:>12} {:>8}".format("parser", "backend", "full ms", "parse_only ms", "speedup"))
+    with app.app_context():
+        for backend in BACKENDS:
+            if builder_registry.lookup(backend) is None:
+                continue
+            app.config["HTML_PARSER"] = backend
+
+            for parser_class in (JobParser, EmployerParser):
+                app.config["HTML_PARSE_ONLY"] = False
+                full_ms, full = time_pages(pages, parser_class, repeat)
+                app.config["HTML_PARSE_ONLY"] = True
+                only_ms, only = time_pages(pages, parser_class, repeat)
+
+                if full != only:
+                    raise AssertionError("{} output differs with parse_only on {}".format(
+                        parser_class.__name__, backend))
+
+                print("{:<15} {:<12} {:>10.2f} {:>12.2f} {:>7.2f}x".format(
+                    parser_class.__name__, backend, full_ms, only_ms, full_ms / only_ms))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
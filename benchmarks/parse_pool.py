@@ -0,0 +1,71 @@
+'''Scaling of the download pipeline parse stage with the number of parser processes.
+
+Recorded job pages from tests/fixtures are replicated and "fetched" from
+memory, so the timings only measure parsing and the hand-off between
+download threads, parser processes and the main process:
+
+    python -m benchmarks.parse_pool [copies] [max parse workers]
+'''
+import os
+import sys
+import time
+
+import itviec.cache
+from itviec import create_app
+from itviec.workers import run_pipeline
+from tests.standin import load_routes
+
+
+def recorded_job_pages(copies):
+    '''{job code: html} with every recorded job page repeated copies times'''
+    pages = {}
+    for path, (body, _) in sorted(load_routes().items()):
+        if path.startswith("/it-jobs/"):
+            code = path.split("/")[2]
+            for i in range(copies):
+                pages["{}-{}".format(code, i)] = body
+    return pages
+
+
+def time_pipeline(pages, parse_workers):
+    '''Seconds to parse every page with parse_workers processes, and the parsed jobs'''
+    jobs = {}
+
+    def save(code, job):
+        jobs[code] = job
+
+    start = time.perf_counter()
+    run_pipeline(pages.get, itviec.cache.parse_job_html, save, list(pages), "jobs",
+                 parse_workers=parse_workers)
+    return time.perf_counter() - start, jobs
+
+
+def main(copies=100, max_workers=None):
+    app = create_app(profile="testing", test_config={"SQLALCHEMY_ECHO": False, "VERBOSE": False,
+                                                     "PARSE_POOL_MIN_ITEMS": 0})
+    pages = recorded_job_pages(copies)
+    max_workers = max_workers or os.cpu_count()
+
+    results = []
+    with app.app_context():
+        baseline, expected = time_pipeline(pages, 0)
+        results.append((0, baseline))
+
+        parse_workers = 1
+        while parse_workers <= max_workers:
+            elapsed, jobs = time_pipeline(pages, parse_workers)
+            if jobs != expected:
+                raise AssertionError("Parsed jobs differ with {} parse workers".format(parse_workers))
+            results.append((parse_workers, elapsed))
+            parse_workers *= 2
+
+    print("")
+    print("{} pages, {} CPUs".format(len(pages), os.cpu_count()))
+    print("{:>14} {:>10} {:>10} {:>8}".format("parse workers", "seconds", "pages/s", "speedup"))
+    for parse_workers, elapsed in results:
+        print("{:>14} {:>10.2f} {:>10.1f} {:>7.2f}x".format(
+            parse_workers or "threads", elapsed, len(pages) / elapsed, baseline / elapsed))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,151 @@
+'''Time, memory and tree size of every parser on the pages in benchmarks/fixtures.
+
+Runs offline. Results can be saved and compared from commit to commit:
+
+    python -m benchmarks.parsers --save before.json
+    python -m benchmarks.parsers --compare before.json
+
+Memory is measured with tracemalloc over a single parse: peak is the most
+memory held at once while parsing, kept is what is still held by the result.
+Tree size counts the tags and strings of the BeautifulSoup tree the parser
+builds, with HTML_PARSE_ONLY applied.
+'''
+import argparse
+import gc
+import json
+import os
+import time
+import tracemalloc
+
+from bs4 import NavigableString
+
+from itviec import create_app
+from itviec.feeds import JobTagIterator, build_review_page
+from itviec.parsers import (EMPLOYER_PAGE_ONLY, JOB_PAGE_ONLY, EmployerParser, JobParser, JobTagParser,
+                            ReviewParser, parse_job_cards)
+from itviec.soup import make_soup
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+REVIEWS_URL = "https://itviec.com/companies/acme-software/review"
+
+
+def read_fixture(filename):
+    with open(os.path.join(FIXTURES_DIR, filename), "r") as fixture_file:
+        return fixture_file.read()
+
+
+def feed_jobs_html(filename):
+    return json.loads(read_fixture(filename))["jobs_html"]
+
+
+def parse_employer(html):
+    return EmployerParser("acme-software").parse_employer_page(html)
+
+
+def parse_job(html):
+    return JobParser("senior-python-developer-acme-software-1234").parse_job_page(html)
+
+
+def parse_reviews(html):
+    return [ReviewParser(review_tag).get_dict() for review_tag in build_review_page(REVIEWS_URL, html)]
+
+
+def parse_job_tags(jobs_html):
+    return [JobTagParser(job_tag).get_dict() for job_tag in JobTagIterator(jobs_html)]
+
+
+# (case, parser, page, tree strainer)
+CASES = (
+    ("employer small", parse_employer, ("employer_small.html", read_fixture), EMPLOYER_PAGE_ONLY),
+    ("employer large", parse_employer, ("employer_large.html", read_fixture), EMPLOYER_PAGE_ONLY),
+    ("reviews large", parse_reviews, ("reviews_large.html", read_fixture), None),
+    ("feed JobTagParser", parse_job_tags, ("feed_page_20.json", feed_jobs_html), None),
+    ("feed parse_job_cards", parse_job_cards, ("feed_page_20.json", feed_jobs_html), None),
+    ("job long description", parse_job, ("job_long_description.html", read_fixture), JOB_PAGE_ONLY),
+)
+
+
+def tree_size(page, parse_only):
+    '''(tags, strings) of the tree built for page'''
+    tags = strings = 0
+    for node in make_soup(page, parse_only=parse_only).descendants:
+        if isinstance(node, NavigableString):
+            strings += 1
+        else:
+            tags += 1
+    return tags, strings
+
+
+def measure(parser, page, parse_only, repeat):
+    parser(page)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parser(page)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = parser(page)
+    # Trees are reference cycles, only freed by the garbage collector
+    gc.collect()
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    tags, strings = tree_size(page, parse_only)
+    return {
+        "ms": elapsed * 1000 / repeat,
+        "peak_kb": peak / 1024,
+        "kept_kb": kept / 1024,
+        "tags": tags,
+        "strings": strings,
+        "page_kb": len(page) / 1024,
+    }
+
+
+def print_results(results, baseline=None):
+    print("{:<22} {:>8} {:>9} {:>9} {:>9} {:>7} {:>8} {:>9}".format(
+        "case", "page KB", "ms", "peak KB", "kept KB", "tags", "strings", "vs saved"))
+    for case, result in results.items():
+        change = ""
+        if baseline and case in baseline:
+            change = "{:+.1f}%".format((result["ms"] / baseline[case]["ms"] - 1) * 100)
+        print("{:<22} {:>8.1f} {:>9.2f} {:>9.1f} {:>9.1f} {:>7} {:>8} {:>9}".format(
+            case, result["page_kb"], result["ms"], result["peak_kb"], result["kept_kb"],
+            result["tags"], result["strings"], change))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the page parsers on recorded pages.")
+    parser.add_argument("--repeat", type=int, default=20, help="parses per case")
+    parser.add_argument("--backend", default=None, help="HTML_PARSER")
+    parser.add_argument("--save", metavar="FILE", help="save results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare with results saved with --save")
+    args = parser.parse_args()
+
+    test_config = {"SQLALCHEMY_ECHO": False, "VERBOSE": False}
+    if args.backend:
+        test_config["HTML_PARSER"] = args.backend
+    app = create_app(profile="testing", test_config=test_config)
+
+    results = {}
+    with app.app_context():
+        for case, parse, (filename, read), parse_only in CASES:
+            results[case] = measure(parse, read(filename), parse_only, args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    print("")
+    print("HTML parser: {}, {} parses per case".format(app.config["HTML_PARSER"], args.repeat))
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as results_file:
+            json.dump(results, results_file, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+'''Time of the queries behind the /tags and city views, and of the
+employer relationships, before and after 'flask migrate-schema'.
+
+Runs offline on a generated sqlite database made with the schema of older
+versions, links without primary keys and no foreign key indexes:
+
+    python -m benchmarks.queries --jobs 20000 --employers 2000 --tags 300
+
+The same database is then migrated in place and measured again.
+'''
+import argparse
+import contextlib
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from itviec import create_app
+from itviec.db import db
+from itviec.migrate import migrate_schema
+from itviec.models import Address, Employer, Job, Review, Tag
+from itviec.models import employer_address, employer_tag, job_address, job_tag
+from tests.standin import cache_config
+
+LAST_POST = datetime(2020, 1, 10, 8, 15)
+CITIES = ("Ho Chi Minh", "Ha Noi", "Da Nang", "Can Tho")
+REVIEW_STARS = {"recommend": True, "stars_total": 4, "stars_salary": 4, "stars_training": 4,
+                "stars_management": 4, "stars_culture": 4, "stars_workspace": 4}
+
+
+def make_legacy_schema(conn):
+    '''Drop the link keys and the indexes older versions did not have'''
+    for table in (employer_address, employer_tag, job_address, job_tag):
+        owner, target = [column.name for column in table.columns]
+        conn.execute(text("DROP TABLE {}".format(table.name)))
+        conn.execute(text("CREATE TABLE {} ({} INTEGER, {} INTEGER)".format(table.name, owner, target)))
+    for name in ("ix_job_employer_code", "ix_review_employer_code"):
+        conn.execute(text("DROP INDEX {}".format(name)))
+
+
+def populate(conn, jobs, employers, tags, reviews):
+    rnd = random.Random(0)
+    employer_codes = ["employer-{}".format(i) for i in range(employers)]
+    conn.execute(Employer.__table__.insert(), [
+        {"code": code, "name": code, "logo": "", "location": "", "industry": "", "employees": "", "country": "",
+         "last_update": LAST_POST, "last_post": LAST_POST, "overview": ""} for code in employer_codes])
+    conn.execute(Job.__table__.insert(), [
+        {"code": "job-{}".format(i), "title": "Job {}".format(i), "salary": "",
+         "employer_code": employer_codes[i % employers], "last_update": LAST_POST, "last_post": LAST_POST,
+         "description": "", "skills_experience": "", "reasons": ""} for i in range(jobs)])
+    conn.execute(Review.__table__.insert(), [
+        dict(REVIEW_STARS, title="Review {}".format(i), employer_code=employer_codes[i % employers], date=LAST_POST)
+        for i in range(reviews)])
+    conn.execute(Tag.__table__.insert(), [{"name": "tag-{}".format(i)} for i in range(tags)])
+
+    addresses = employers * 2
+    conn.execute(Address.__table__.insert(), [
+        {"full_address": "{} Street, District {}, {}".format(i, i % 12, CITIES[i % len(CITIES)]),
+         "district": "District {}".format(i % 12), "city": CITIES[i % len(CITIES)]} for i in range(addresses)])
+
+    conn.execute(job_tag.insert(), [{"job_id": job_id, "tag_id": tag_id} for job_id in range(1, jobs + 1)
+                                    for tag_id in rnd.sample(range(1, tags + 1), 3)])
+    conn.execute(job_address.insert(), [{"job_id": job_id, "address_id": rnd.randint(1, addresses)}
+                                        for job_id in range(1, jobs + 1)])
+    conn.execute(employer_tag.insert(), [{"employer_id": employer_id, "tag_id": tag_id}
+                                         for employer_id in range(1, employers + 1)
+                                         for tag_id in rnd.sample(range(1, tags + 1), 3)])
+    conn.execute(employer_address.insert(), [{"employer_id": employer_id, "address_id": employer_id * 2}
+                                             for employer_id in range(1, employers + 1)])
+
+
+def tags_view():
+    '''Job count of every tag, as the /tags view'''
+    return sum(tag.jobs.count() for tag in db.session.query(Tag))
+
+
+def city_views():
+    '''Jobs of every city and of none of them, as the /jobs/<city> views'''
+    counts = [Job.query.filter(Job.addresses.any(city=city)).count() for city in CITIES[:3]]
+    jobs_union = Job.query.filter(Job.addresses.any(Address.city.in_(CITIES[:3])))
+    return sum(counts) + Job.query.except_(jobs_union).count()
+
+
+def employer_relations(sample):
+    '''Jobs, reviews, tags and addresses of sample employers'''
+    count = 0
+    for employer in db.session.query(Employer).limit(sample):
+        count += employer.jobs.count() + employer.reviews.count() + len(employer.tags) + len(employer.addresses)
+    return count
+
+
+def measure(queries, repeat):
+    results = {}
+    for name, query in queries:
+        db.session.remove()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            query()
+        results[name] = (time.perf_counter() - start) / repeat
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the view queries before and after the schema migration.")
+    parser.add_argument("--jobs", type=int, default=20000, help="jobs in the database")
+    parser.add_argument("--employers", type=int, default=2000, help="employers in the database")
+    parser.add_argument("--tags", type=int, default=300, help="tags in the database")
+    parser.add_argument("--reviews", type=int, default=20000, help="reviews in the database")
+    parser.add_argument("--sample", type=int, default=200, help="employers whose relationships are loaded")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query")
+    args = parser.parse_args()
+
+    queries = (("/tags", tags_view), ("city views", city_views),
+               ("employer relations", lambda: employer_relations(args.sample)))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        test_config = cache_config(cache_dir)
+        test_config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(cache_dir, "itviec.sqlite")
+        test_config["SQLALCHEMY_ECHO"] = False
+        app = create_app(profile="testing", test_config=test_config)
+
+        with app.app_context():
+            db.init_db()
+            with db.engine.begin() as conn:
+                make_legacy_schema(conn)
+                populate(conn, args.jobs, args.employers, args.tags, args.reviews)
+
+            before = measure(queries, args.repeat)
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                migrate_schema()
+            after = measure(queries, args.repeat)
+            indexes = sum(len(inspect(db.engine).get_indexes(table)) for table in db.base.metadata.tables)
+
+    print("")
+    print("{} jobs, {} employers, {} tags, {} reviews, {} indexes after migration".format(
+        args.jobs, args.employers, args.tags, args.reviews, indexes))
+    print("{:<20} {:>10} {:>10} {:>8}".format("query", "before s", "after s", "speedup"))
+    for name, _ in queries:
+        print("{:<20} {:>10.3f} {:>10.3f} {:>7.1f}x".format(name, before[name], after[name], before[name] / after[name]))
+
+
+if __name__ == "__main__":
+    main()
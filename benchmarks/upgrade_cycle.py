@@ -0,0 +1,190 @@
+'''Wall time, request rate, parse time, database time and peak RSS of a full
+'flask update' + 'flask upgrade' cycle against a local stand-in of itviec.com.
+
+The recorded pages in tests/fixtures are replicated until the feed lists
+--jobs jobs, and served with --latency seconds of delay per request:
+
+    python -m benchmarks.upgrade_cycle --jobs 500 --latency 0.05
+
+Parse time is the time spent building BeautifulSoup trees in this process,
+summed over threads, plus the CPU time of the parser processes. Database
+time is the time spent executing SQL statements.
+'''
+import argparse
+import contextlib
+import json
+import os
+import resource
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+import itviec.soup
+import itviec.source
+import itviec.upgrade
+from itviec import create_app
+from itviec.client import get_client
+from itviec.db import db
+from tests.standin import StandInServer, cache_config, load_routes, replicate_routes
+
+
+class Timer:
+    '''Thread safe sum of the durations of timed calls'''
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.seconds += seconds
+
+    def wrap(self, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(time.perf_counter() - start)
+        return timed
+
+
+class PeakRss:
+    '''Samples the resident set size of this process in a background thread'''
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+
+def current_rss():
+    '''Resident set size in bytes, or the peak so far where /proc is missing'''
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def children_cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Stages:
+    '''Runs the cycle stage by stage and collects their measurements'''
+
+    def __init__(self):
+        self.parse = Timer()
+        self.database = Timer()
+        self.results = []
+
+        self.BeautifulSoup = itviec.soup.BeautifulSoup
+        itviec.soup.BeautifulSoup = self.parse.wrap(itviec.soup.BeautifulSoup)
+
+        starts = threading.local()
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            starts.time = time.perf_counter()
+
+        @event.listens_for(db.engine, "after_cursor_execute")
+        def after_execute(conn, cursor, statement, parameters, context, executemany):
+            self.database.add(time.perf_counter() - starts.time)
+
+    def close(self):
+        itviec.soup.BeautifulSoup = self.BeautifulSoup
+
+    def run(self, name, func, *args):
+        stats = get_client().stats
+        requests = stats["requests"]
+        parse = self.parse.seconds + children_cpu_time()
+        database = self.database.seconds
+
+        with PeakRss() as rss:
+            start = time.perf_counter()
+            with contextlib.suppress(SystemExit):
+                func(*args)
+            wall = time.perf_counter() - start
+
+        self.results.append({
+            "stage": name,
+            "wall": wall,
+            "requests": stats["requests"] - requests,
+            "parse": self.parse.seconds + children_cpu_time() - parse,
+            "database": self.database.seconds - database,
+            "rss": rss.peak,
+        })
+
+    def report(self):
+        print("")
+        print("{:<10} {:>9} {:>9} {:>9} {:>9} {:>9} {:>10}".format(
+            "stage", "wall s", "requests", "req/s", "parse s", "db s", "peak RSS"))
+        for result in self.results:
+            print("{:<10} {:>9.2f} {:>9} {:>9.1f} {:>9.2f} {:>9.2f} {:>8.1f}MB".format(
+                result["stage"], result["wall"], result["requests"], result["requests"] / result["wall"],
+                result["parse"], result["database"], result["rss"] / 2 ** 20))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a full update and upgrade cycle.")
+    parser.add_argument("--jobs", type=int, default=500, help="jobs listed in the feed")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of delay per request")
+    parser.add_argument("--workers", type=int, default=None, help="DOWNLOAD_WORKERS")
+    parser.add_argument("--parse-workers", type=int, default=None, help="PARSE_WORKERS")
+    args = parser.parse_args()
+
+    recorded = load_routes()
+    jobs_per_copy = len([path for path in recorded if path.startswith("/it-jobs/")])
+    employers_per_copy = len(json.loads(recorded["/api/v1/employers.json"][0]))
+    copies = max(1, args.jobs // jobs_per_copy)
+    server = StandInServer(replicate_routes(copies, recorded), latency=args.latency).start()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        test_config = server.config()
+        test_config.update(cache_config(cache_dir))
+        test_config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(cache_dir, "itviec.sqlite")
+        if args.workers:
+            test_config["DOWNLOAD_WORKERS"] = args.workers
+        if args.parse_workers is not None:
+            test_config["PARSE_WORKERS"] = args.parse_workers
+
+        app = create_app(profile="testing", test_config=test_config)
+        with app.app_context():
+            db.init_db()
+            stages = Stages()
+            try:
+                stages.run("update", itviec.source.fetch_all)
+                stages.run("download", itviec.upgrade.download, False)
+                stages.run("upgrade", itviec.upgrade.upgrade, False)
+            finally:
+                stages.close()
+                server.stop()
+
+    print("")
+    print("{} jobs, {} employers, {:.3f}s latency, {} download workers, {} parse workers".format(
+        copies * jobs_per_copy, copies * employers_per_copy, args.latency,
+        app.config["DOWNLOAD_WORKERS"], app.config["PARSE_WORKERS"]))
+    stages.report()
+
+
+if __name__ == "__main__":
+    main()
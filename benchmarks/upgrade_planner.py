@@ -0,0 +1,94 @@
+'''Time and SQL statements of the upgrade planner on a large database and feed.
+
+Runs offline on a generated sqlite database of --jobs jobs and --employers
+employers, and a feed snapshot where --changed of the jobs were posted
+again and --new of them are not in the database yet:
+
+    python -m benchmarks.upgrade_planner --jobs 10000 --employers 2000
+'''
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+import itviec.source
+from itviec import create_app
+from itviec.db import db
+from itviec.models import Employer, Job
+from itviec.upgrade import _add_employers_from_jobs, calculate_employer_upgrades, calculate_job_upgrades
+from tests.standin import cache_config
+
+LAST_POST = datetime(2020, 1, 10, 8, 15)
+
+
+def employer_row(code):
+    return {"code": code, "name": code, "logo": "", "location": "", "industry": "", "employees": "",
+            "country": "", "last_update": LAST_POST, "last_post": LAST_POST, "overview": ""}
+
+
+def job_row(code, employer_code):
+    return {"code": code, "title": code, "salary": "", "employer_code": employer_code, "last_update": LAST_POST,
+            "last_post": LAST_POST, "description": "", "skills_experience": "", "reasons": ""}
+
+
+def populate(jobs, employers, changed, new):
+    '''Fill the database and return the feed job tags'''
+    employer_codes = ["employer-{}".format(i) for i in range(employers)]
+    job_tags = []
+    for i in range(jobs):
+        last_post = LAST_POST + timedelta(days=3) if i % round(1 / changed) == 0 else LAST_POST
+        job_tags.append({"code": "job-{}".format(i), "employer_code": employer_codes[i % employers],
+                         "last_update": last_post, "last_post": last_post})
+
+    new_count = int(jobs * new)
+    # Jobs missing from the feed are in the database too
+    db_jobs = [job_row(job_tag["code"], job_tag["employer_code"]) for job_tag in job_tags[new_count:]]
+    db_jobs += [job_row("expired-job-{}".format(i), employer_codes[0]) for i in range(new_count)]
+
+    db.engine.execute(Employer.__table__.insert(), [employer_row(code) for code in employer_codes[1:]])
+    db.engine.execute(Job.__table__.insert(), db_jobs)
+    return job_tags
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the upgrade planner.")
+    parser.add_argument("--jobs", type=int, default=10000, help="jobs in the feed")
+    parser.add_argument("--employers", type=int, default=2000, help="employers in the feed")
+    parser.add_argument("--changed", type=float, default=0.1, help="share of jobs posted again")
+    parser.add_argument("--new", type=float, default=0.05, help="share of jobs missing from the database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        test_config = cache_config(cache_dir)
+        test_config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(cache_dir, "itviec.sqlite")
+        app = create_app(profile="testing", test_config=test_config)
+
+        with app.app_context():
+            db.init_db()
+            itviec.source.write_job_tags(populate(args.jobs, args.employers, args.changed, args.new))
+
+            statements = []
+            event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+            start = time.perf_counter()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                feed_jobs = itviec.source.get_job_tags()
+                jobs = calculate_job_upgrades(feed_jobs)
+                employers = calculate_employer_upgrades(feed_jobs)
+                _add_employers_from_jobs(employers, jobs)
+            elapsed = time.perf_counter() - start
+
+    print("")
+    print("{} feed jobs, {} employers".format(args.jobs, args.employers))
+    print("Plan: jobs: create {} update {} delete {}, employers: create {} update {} delete {}".format(
+        len(jobs["create"]), len(jobs["update"]), len(jobs.get("delete", ())),
+        len(employers["create"]), len(employers["update"]), len(employers.get("delete", ()))))
+    print("Planned in {:.3f}s with {} SQL statements".format(elapsed, len(statements)))
+
+
+if __name__ == "__main__":
+    main()
@@ -21,9 +21,10 @@ class Config:
     CACHE_DIR = os.path.join(INSTANCE_DIR, "cache")
     JOBS_CACHE_DIR = os.path.join(CACHE_DIR, "jobs")
     EMPLOYERS_CACHE_DIR = os.path.join(CACHE_DIR, "employers")
+    HTTP_CACHE_DIR = os.path.join(CACHE_DIR, "http")
+    ARCHIVE_DIR = os.path.join(CACHE_DIR, "archive")
 
     CONFIG_FILENAME = "config.py"
-    DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 
     # ItViec urls
     BASE_URL = "https://itviec.com"
@@ -32,17 +33,48 @@ class Config:
     TEMPLATE_EMPLOYER_URL = "https://itviec.com/companies/{}"
     TEMPLATE_EMPLOYER_REVIEW_URL = "https://itviec.com/companies/{}/review"
 
+    # Download engine: concurrent requests and global rate limit shared by them
+    DOWNLOAD_WORKERS = 4
+    DOWNLOAD_RATE = 2.0  # requests per second, retries included, 0 disables the limit
+    DOWNLOAD_BURST = 4
+    CRAWL_QUEUE_SIZE = 20  # feed pages and jobs waiting between crawl stages
+    FEED_PREFETCH_DEPTH = 0  # feed and review pages fetched ahead, 0 disables prefetching
+    PARSE_WORKERS = os.cpu_count() or 1  # parser processes, 0 parses pages in the download threads
+    PARSE_POOL_MIN_ITEMS = 50  # smaller downloads are parsed in the download threads, a pool costs an app per worker
+    REVIEWS_INCREMENTAL = True  # fetch reviews pages only until the first one ending with a cached review
+
+    # HTML parser backend: html.parser, html5lib or lxml (fastest)
+    HTML_PARSER = "html.parser"
+    HTML_PARSE_ONLY = True  # build trees only for the page parts read by the parsers
+
     # Database / SQLAlchemy
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    BULK_BATCH_SIZE = 100  # employers, with their jobs and reviews, loaded per transaction
+    UPGRADE_COMMIT_EVERY = 50  # employers updated per transaction, 0 commits once at the end
     BOOTSTRAP_SERVE_LOCAL = True
 
+    # HTTP client
+    HTTP_POOL_SIZE = 10
+    HTTP_RETRIES = 5
+    HTTP_BACKOFF_FACTOR = 0.5
+    HTTP_TIMEOUT = (10, 30)  # (connect, read) seconds
+    HTTP_CACHE = True  # conditional requests with validators stored in HTTP_CACHE_DIR
+    ARCHIVE = True  # keep every fetched page in ARCHIVE_DIR
+    HTTP_OFFLINE = False  # replay pages from ARCHIVE_DIR instead of fetching them
+
     # ItViec request header for json
     HTTP_HEADER_X_REQUESTED_WITH = "XMLHttpRequest"
     # HTTP_HEADER_COOKIE = "_ITViec_session=..."
 
     # Cache files
+    CACHE_BACKEND = "directory"  # jobs and employers cache: "directory" of JSON files or "sqlite" CACHE_DB_FILE
+    CACHE_DB_FILE = os.path.join(CACHE_DIR, "cache.sqlite")
+    CACHE_ENCODING = "json"  # json, or smaller and versioned json.gz or msgpack.gz, all read back
+    CACHE_TTL_DAYS = 30  # cached jobs and employers missing from the feed are kept this long
+    CACHE_MAX_SIZE = 0  # bytes of cached jobs and employers, oldest are evicted above it, 0 disables the limit
+    CACHE_GC_AFTER_UPGRADE = False  # run 'flask cache-gc' after 'flask upgrade'
     EMPLOYERS_JSON_FILE = os.path.join(CACHE_DIR, "employers.json")
-    JOBS_JSON_FILE = os.path.join(CACHE_DIR, "jobs.json")
+    JOBS_JSON_FILE = os.path.join(CACHE_DIR, "jobs.json")  # feed snapshot, one JSON job tag per line
 
 
 class DevelopmentConfig(Config):
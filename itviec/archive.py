@@ -0,0 +1,83 @@
+import gzip
+import hashlib
+import os
+import threading
+from datetime import datetime
+
+
+class ArchiveMiss(KeyError):
+    pass
+
+
+class Archive:
+    '''Compressed, content-addressed store of every fetched page.
+
+    Bodies are stored once per content hash in objects/<xx>/<hash>.gz. Each url
+    has a log in urls/<url hash>.log with one "<fetch time> <content hash> <url>"
+    line per fetch, so any past version of a page can be replayed offline.
+    '''
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, "objects")
+        self.urls_dir = os.path.join(directory, "urls")
+        self.lock = threading.Lock()
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.urls_dir, exist_ok=True)
+
+    def __repr__(self):
+        return "<Archive {}>".format(self.directory)
+
+    def object_path(self, content_hash):
+        return os.path.join(self.objects_dir, content_hash[:2], content_hash + ".gz")
+
+    def log_path(self, url):
+        url_hash = hashlib.sha1(url.encode("utf8")).hexdigest()
+        return os.path.join(self.urls_dir, url_hash + ".log")
+
+    def store(self, url, body, fetched=None):
+        fetched = fetched or datetime.now()
+        content_hash = hashlib.sha1(body).hexdigest()
+
+        path = self.object_path(content_hash)
+        if not os.path.isfile(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = "{}.{}.tmp".format(path, threading.get_ident())
+            with gzip.open(tmp_path, "wb") as object_file:
+                object_file.write(body)
+            os.replace(tmp_path, path)
+
+        line = "{} {} {}\n".format(fetched.isoformat(timespec="seconds"), content_hash, url)
+        with self.lock:
+            with open(self.log_path(url), "a") as log_file:
+                log_file.write(line)
+
+        return content_hash
+
+    def history(self, url):
+        '''List of (fetch time, content hash) for url, oldest first'''
+        try:
+            with open(self.log_path(url), "r") as log_file:
+                lines = log_file.read().splitlines()
+        except OSError:
+            return []
+
+        history = []
+        for line in lines:
+            fetched, content_hash, _ = line.split(" ", 2)
+            history.append((fetched, content_hash))
+        return history
+
+    def get(self, content_hash):
+        with gzip.open(self.object_path(content_hash), "rb") as object_file:
+            return object_file.read()
+
+    def latest(self, url):
+        history = self.history(url)
+        if not history:
+            raise ArchiveMiss("Url not found in archive: {}".format(url))
+        return self.get(history[-1][1])
+
+    def __contains__(self, url):
+        return os.path.isfile(self.log_path(url))
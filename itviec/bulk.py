@@ -0,0 +1,204 @@
+from flask import current_app as app
+from sqlalchemy import bindparam, select, text
+
+from itviec import cache
+from itviec.db import db
+from itviec.helpers import to_json
+from itviec.models import Address, Employer, Job, Review, Tag
+from itviec.models import employer_address, employer_tag, job_address, job_tag
+
+# Values per IN (...) list, below the sqlite limit of bound parameters
+IN_CHUNK_SIZE = 500
+
+# First sqlite release with INSERT ... ON CONFLICT
+UPSERT_SQLITE_VERSION = (3, 24, 0)
+
+
+def load_employers(employer_codes, batch_size=None):
+    '''Insert or update cached employers with their jobs, reviews, tags and addresses.
+
+    Rows are written with executemany upserts in one transaction per
+    batch_size employers, BULK_BATCH_SIZE by default. Jobs missing from the
+    cache are fetched. Returns the count of loaded employers, jobs and reviews.
+    '''
+    check_upsert_support(db.engine.dialect)
+    employer_codes = list(employer_codes)
+    batch_size = batch_size or app.config["BULK_BATCH_SIZE"]
+
+    counts = {"employers": 0, "jobs": 0, "reviews": 0}
+    for start in range(0, len(employer_codes), batch_size):
+        batch = employer_codes[start:start + batch_size]
+        employers = cache.get_employers(batch)
+        for employer_code in batch:
+            if employer_code not in employers:
+                print("Employer '{}' is not cached, skipping it.".format(employer_code))
+
+        jobs = get_employer_jobs(employers.values())
+        load_batch(employers, jobs)
+        db.session.commit()
+
+        counts["employers"] += len(employers)
+        counts["jobs"] += len(jobs)
+        counts["reviews"] += sum(len(employer["reviews"]) for employer in employers.values())
+        print("Loaded {} employers, {} jobs, {} reviews.".format(counts["employers"], counts["jobs"], counts["reviews"]))
+
+    return counts
+
+
+def get_employer_jobs(employers):
+    '''{code: job} of the jobs of employers, fetching the ones missing from the cache'''
+    job_codes = [job_tag["code"] for employer in employers for job_tag in employer["jobs"]]
+    jobs = cache.get_jobs(job_codes)
+
+    for job_code in job_codes:
+        if job_code not in jobs:
+            cache.fetch_job(job_code)
+            jobs[job_code] = cache.get_job(job_code)
+    return jobs
+
+
+def load_batch(employers, jobs):
+    # Tags and addresses pending in the session must exist before the inserts
+    db.session.flush()
+    conn = db.session.connection()
+
+    tag_names = set()
+    full_addresses = set()
+    for item in list(employers.values()) + list(jobs.values()):
+        tag_names.update(item["tags"])
+        full_addresses.update(address for address in item["addresses"] if address)
+
+    tag_ids = insert_missing(conn, Tag.__table__, "name", [{"name": name} for name in tag_names])
+    address_ids = insert_missing(conn, Address.__table__, "full_address",
+                                 [address_row(full_address) for full_address in full_addresses])
+
+    upsert(conn, Employer.__table__, "code", [employer_row(employer) for employer in employers.values()])
+    upsert(conn, Job.__table__, "code", [job_row(job) for job in jobs.values()])
+    employer_ids = select_ids(conn, Employer.__table__, "code", employers)
+    job_ids = select_ids(conn, Job.__table__, "code", jobs)
+
+    replace_links(conn, employer_tag, employer_ids, employers, "tags", tag_ids)
+    replace_links(conn, employer_address, employer_ids, employers, "addresses", address_ids)
+    replace_links(conn, job_tag, job_ids, jobs, "tags", tag_ids)
+    replace_links(conn, job_address, job_ids, jobs, "addresses", address_ids)
+
+    # Reviews have no natural key, the ones of the batch employers are replaced
+    reviews = Review.__table__
+    for codes in chunks(list(employers)):
+        conn.execute(reviews.delete().where(reviews.c.employer_code.in_(codes)))
+    review_rows = [review_row(employer["code"], review) for employer in employers.values()
+                   for review in employer["reviews"]]
+    if review_rows:
+        conn.execute(reviews.insert(), review_rows)
+
+    # Rows were inserted behind the Tag and Address registry of the session
+    registry = db.session.info.get("registry")
+    if registry is not None:
+        registry.clear()
+
+
+def check_upsert_support(dialect):
+    '''Raise RuntimeError if the database can't run the upserts of load_batch'''
+    if dialect.name == "postgresql":
+        return
+
+    if dialect.name != "sqlite":
+        raise RuntimeError("Bulk loading needs sqlite or PostgreSQL, the database is {}.".format(dialect.name))
+
+    version = dialect.dbapi.sqlite_version_info
+    if version < UPSERT_SQLITE_VERSION:
+        raise RuntimeError("Bulk loading needs sqlite {} or newer for INSERT ... ON CONFLICT, "
+                           "Python is linked with sqlite {}.".format(".".join(map(str, UPSERT_SQLITE_VERSION)),
+                                                                     ".".join(map(str, version))))
+
+
+def upsert(conn, table, key, rows):
+    '''INSERT ... ON CONFLICT (key) DO UPDATE of rows, holding every column but id.
+
+    SQLAlchemy 1.3 has no sqlite upsert construct, the statement is written
+    in the syntax shared by sqlite 3.24+ and PostgreSQL.
+    '''
+    if not rows:
+        return
+
+    quote = conn.dialect.identifier_preparer.quote
+    columns = [column for column in table.columns if column.name != "id"]
+    statement = "INSERT INTO {} ({}) VALUES ({}) ON CONFLICT ({}) DO UPDATE SET {}".format(
+        quote(table.name),
+        ", ".join(quote(column.name) for column in columns),
+        ", ".join(":" + column.name for column in columns),
+        quote(key),
+        ", ".join("{0} = excluded.{0}".format(quote(column.name)) for column in columns if column.name != key))
+
+    # Typed parameters, so values are stored as the ORM would store them
+    params = [bindparam(column.name, type_=column.type) for column in columns]
+    conn.execute(text(statement).bindparams(*params), rows)
+
+
+def insert_missing(conn, table, key, rows):
+    '''Insert the rows whose key is not in table yet, returns {key: id} of all rows'''
+    if rows:
+        quote = conn.dialect.identifier_preparer.quote
+        names = list(rows[0])
+        statement = "INSERT INTO {} ({}) VALUES ({}) ON CONFLICT ({}) DO NOTHING".format(
+            quote(table.name), ", ".join(quote(name) for name in names), ", ".join(":" + name for name in names),
+            quote(key))
+        conn.execute(text(statement), rows)
+    return select_ids(conn, table, key, [row[key] for row in rows])
+
+
+def select_ids(conn, table, key, values):
+    '''{key: id} of the rows of table with key in values'''
+    ids = {}
+    for chunk in chunks(list(values)):
+        ids.update(conn.execute(select([table.c[key], table.c.id]).where(table.c[key].in_(chunk))).fetchall())
+    return ids
+
+
+def replace_links(conn, table, owner_ids, owners, field, ref_ids):
+    '''Replace the association rows of owners with the ones of their field names'''
+    owner_column, ref_column = [column.name for column in table.columns]
+
+    for chunk in chunks(list(owner_ids.values())):
+        conn.execute(table.delete().where(table.c[owner_column].in_(chunk)))
+
+    rows = []
+    for code, owner in owners.items():
+        names = dict.fromkeys(name for name in owner[field] if name)
+        rows.extend({owner_column: owner_ids[code], ref_column: ref_ids[name]} for name in names)
+    if rows:
+        conn.execute(table.insert(), rows)
+
+
+def chunks(values, size=IN_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def employer_row(employer):
+    row = {column.name: employer.get(column.name) for column in Employer.__table__.columns if column.name != "id"}
+    row["why"] = to_json(employer["why"], indent=None)
+    return row
+
+
+def job_row(job):
+    return {column.name: job.get(column.name) for column in Job.__table__.columns if column.name != "id"}
+
+
+def review_row(employer_code, review):
+    row = {column.name: review.get(column.name) for column in Review.__table__.columns if column.name != "id"}
+    row["employer_code"] = employer_code
+    return row
+
+
+def address_row(full_address):
+    city, district = split_address(full_address)
+    return {"full_address": full_address, "city": city, "district": district}
+
+
+def split_address(full_address):
+    '''(city, district) of a full address, district is None if missing'''
+    parts = full_address.split(", ")[-2:]
+    city = parts.pop()
+    district = parts.pop() if parts else None
+    return city, district
@@ -1,47 +1,122 @@
-import os
-import json
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 from flask import current_app as app
 
-from itviec.parsers import EmployerParser, JobParser
-from itviec.time import str_to_datetime
-from itviec.source import get_employer_feed_date
+from itviec.feeds import ReviewsFeed, get_next_review_url
+from itviec.helpers import fetch_url
+from itviec.parsers import EmployerParser, JobParser, ends_with_known_review, review_key, review_summaries
+from itviec.store import CacheMiss, get_store
+from itviec.time import load_employer_timestamps, load_job_timestamps
+from itviec.source import get_employer_feed_date, get_feed_index
 
 
 def fetch_employer(employer_code):
     employer_p = EmployerParser(employer_code)
     employer_p.fetch_and_parse()
-    employer_p.fetch_and_parse_reviews()
+    employer_p.fetch_and_parse_reviews(get_known_reviews(employer_code))
     employer_p.save_json()
 
 
+def get_known_reviews(employer_code):
+    '''Cached reviews of an employer for incremental review crawls, or None'''
+    if not app.config["REVIEWS_INCREMENTAL"]:
+        return None
+
+    try:
+        return get_employer(employer_code)["reviews"]
+    except CacheMiss:
+        return None
+
+
 def fetch_job(job_code):
     job_p = JobParser(job_code)
     job_p.fetch_and_parse()
     job_p.save_json()
 
 
-def get_job(job_code):
-    filename = "{}.json".format(job_code)
-    path = os.path.join(app.config["JOBS_CACHE_DIR"], filename)
+# Download pipeline stages, see itviec.workers.run_pipeline
+def fetch_job_html(job_code):
+    return fetch_url(JobParser(job_code).get_url()).text
 
-    try:
-        with open(path, "r") as json_file:
-            return json.load(json_file)
-    except OSError:
-        raise
+
+def parse_job_html(job_code, html):
+    job_p = JobParser(job_code)
+    job_p.parse(html)
+    return job_p.job
+
+
+def save_job(job_code, job):
+    job_p = JobParser(job_code)
+    job_p.job = job
+    job_p.save_json()
+
+
+def fetch_employer_html(employer_code):
+    '''Employer page html, (url, html) of its reviews pages and known reviews.
+
+    Like EmployerParser.fetch_and_parse_reviews, with known reviews the
+    pages after the first one ending with a known review are not fetched.
+    Only the review summaries are parsed here, the pages are parsed by
+    parse_employer_html.
+    '''
+    html = fetch_url(EmployerParser(employer_code).get_url()).text
+    known = get_known_reviews(employer_code)
+    known_keys = set(review_key(review) for review in known or ())
+
+    review_pages = []
+    url = ReviewsFeed(employer_code).url()
+    while url:
+        review_html = fetch_url(url).text
+        review_pages.append((url, review_html))
+        if ends_with_known_review(review_summaries(review_html), known_keys):
+            break
+        url = get_next_review_url(review_html)
+
+    return html, review_pages, known
+
+
+def parse_employer_html(employer_code, pages):
+    html, review_pages, known = pages
+
+    employer_p = EmployerParser(employer_code)
+    employer_p.parse(html)
+    for url, review_html in review_pages:
+        employer_p.parse_reviews_page(url, review_html)
+    if known:
+        employer_p.merge_reviews(known)
+    return employer_p.emp
+
+
+def save_employer(employer_code, emp):
+    employer_p = EmployerParser(employer_code)
+    employer_p.emp = emp
+    employer_p.save_json()
+
+
+def get_job(job_code):
+    '''Cached job, raises CacheMiss if it is not cached'''
+    return load_job_timestamps(get_store("jobs").get(job_code))
 
 
 def get_employer(employer_code):
-    filename = "{}.json".format(employer_code)
-    path = os.path.join(app.config["EMPLOYERS_CACHE_DIR"], filename)
+    '''Cached employer, raises CacheMiss if it is not cached'''
+    return load_employer_timestamps(get_store("employers").get(employer_code))
 
-    try:
-        with open(path, "r") as json_file:
-            return json.load(json_file)
-    except OSError:
-        raise
+
+def get_jobs(job_codes):
+    '''{code: job} of the cached jobs among job_codes'''
+    jobs = get_store("jobs").get_many(job_codes)
+    for job in jobs.values():
+        load_job_timestamps(job)
+    return jobs
+
+
+def get_employers(employer_codes):
+    '''{code: employer} of the cached employers among employer_codes'''
+    employers = get_store("employers").get_many(employer_codes)
+    for employer in employers.values():
+        load_employer_timestamps(employer)
+    return employers
 
 
 def is_job_cache_hit(job_tag):
@@ -50,19 +125,16 @@ def is_job_cache_hit(job_tag):
     Input: job_tag from job's feed
     '''
     code = job_tag["code"]
-    # A cache file must exist
-    try:
-        cache = get_job(code)
-    except OSError:
+    # The item must be cached, its index entry has its last_post
+    cache = get_store("jobs").entries().get(code)
+    if cache is None:
         if app.config["DEBUG"] is True:
             print("Could not find cache for job with code '{}'".format(code))
         return False
 
     # Compare 'last_post' dates in cache and update list
     threshold = timedelta(days=1)
-    cache_post = str_to_datetime(cache["last_post"])
-    feed_post = str_to_datetime(job_tag["last_post"])
-    delta = feed_post - cache_post
+    delta = job_tag["last_post"] - cache["last_post"]
 
     # No more than 24h difference between feed and cache
     if delta <= threshold:
@@ -74,10 +146,9 @@ def is_job_cache_hit(job_tag):
 
 
 def is_employer_cache_hit(code, last_post=None):
-    # A cache file must exist
-    try:
-        cache = get_employer(code)
-    except OSError:
+    # The item must be cached, its index entry has its last_post
+    cache = get_store("employers").entries().get(code)
+    if cache is None:
         if app.config["DEBUG"] is True:
             print("Could not find cache for employer with code '{}'".format(code))
         return False
@@ -86,9 +157,7 @@ def is_employer_cache_hit(code, last_post=None):
         last_post = get_employer_feed_date(code)
 
     threshold = timedelta(days=1)
-    cache_post = str_to_datetime(cache["last_post"])
-    feed_post = str_to_datetime(last_post)
-    delta = feed_post - cache_post
+    delta = last_post - cache["last_post"]
 
     # No more than 24h difference between feed and cache
     if delta <= threshold:
@@ -102,7 +171,7 @@ def is_employer_cache_hit(code, last_post=None):
 def job_cache_or_fetch(job_tag):
     try:
         job_d = get_job(job_tag["code"])
-    except OSError:
+    except CacheMiss:
         fetch_job(job_tag["code"])
         job_d = get_job(job_tag["code"])
     return job_d
@@ -111,19 +180,66 @@ def job_cache_or_fetch(job_tag):
 def employer_cache_or_fetch(employer_code):
     try:
         job_d = get_employer(employer_code)
-    except OSError:
+    except CacheMiss:
         fetch_employer(employer_code)
         job_d = get_employer(employer_code)
     return job_d
 
 
+def rebuild_index():
+    '''Index every cached job and employer again'''
+    for kind in ("jobs", "employers"):
+        store = get_store(kind)
+        entries = store.index.rebuild(store)
+        size = sum(entry["size"] for entry in entries.values())
+        print("Indexed {} {} [{} bytes]".format(len(entries), kind, size))
+
+
+def collect_garbage(dry_run=False, ttl_days=None, max_size=None):
+    '''Evict cached jobs and employers missing from the feed snapshot and
+    older than CACHE_TTL_DAYS, then the oldest ones while the cache is larger
+    than CACHE_MAX_SIZE bytes, evicting the ones missing from the feed first.
+
+    Ages and sizes come from the cache index. With dry_run nothing is deleted.
+    Returns {kind: (count, bytes)} of the evicted items.
+    '''
+    ttl_days = app.config["CACHE_TTL_DAYS"] if ttl_days is None else ttl_days
+    max_size = app.config["CACHE_MAX_SIZE"] if max_size is None else max_size
+    expiry = datetime.now() - timedelta(days=ttl_days)
+
+    feed = get_feed_index()
+    in_feed = {"jobs": feed.jobs, "employers": feed.employer_jobs}
+
+    # Missing from the feed first, then oldest first
+    items = []
+    for kind in ("jobs", "employers"):
+        for code, entry in get_store(kind).entries().items():
+            items.append((code in in_feed[kind], entry["last_post"] or datetime.min, kind, code, entry["size"]))
+    items.sort()
+
+    size = sum(item[4] for item in items)
+    evicted = {"jobs": [], "employers": []}
+    evicted_size = {"jobs": 0, "employers": 0}
+    for listed, last_post, kind, code, item_size in items:
+        expired = not listed and last_post < expiry
+        if expired or (max_size and size > max_size):
+            evicted[kind].append(code)
+            evicted_size[kind] += item_size
+            size -= item_size
+
+    verb = "Would evict" if dry_run else "Evicted"
+    for kind in ("jobs", "employers"):
+        print("{} {} {} [{} bytes]".format(verb, len(evicted[kind]), kind, evicted_size[kind]))
+        if not dry_run:
+            get_store(kind).delete_many(evicted[kind])
+    print("Cache size: {} bytes".format(size))
+
+    return {kind: (len(evicted[kind]), evicted_size[kind]) for kind in evicted}
+
+
 def is_job_cached(job_code):
-    filename = "{}.json".format(job_code)
-    path = os.path.join(app.config["JOBS_CACHE_DIR"], filename)
-    return os.path.isfile(path)
+    return job_code in get_store("jobs")
 
 
 def is_employer_cached(employer_code):
-    filename = "{}.json".format(employer_code)
-    path = os.path.join(app.config["EMPLOYERS_CACHE_DIR"], filename)
-    return os.path.isfile(path)
+    return employer_code in get_store("employers")
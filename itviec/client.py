@@ -0,0 +1,334 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+
+from flask import current_app as app
+
+from itviec.archive import Archive
+
+# Guards the creation of the client of an app
+_client_lock = threading.Lock()
+
+
+class HttpClient:
+    '''Shared HTTP client with a pooled keep-alive session.
+
+    Every request to ItViec goes through a single requests.Session so TCP/TLS
+    connections are reused between feed pages, jobs, employers and reviews.
+    Responses with status 429 or 5xx are retried with exponential backoff,
+    every retry takes a token of the limiter like the first request.
+    With a ResponseCache, requests are conditional and 304 responses are
+    served from the cached copy. With an Archive, every page is archived and
+    in offline mode pages are replayed from the archive without any request.
+    '''
+
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_size=10, retries=5, backoff_factor=0.5, timeout=(10, 30), limiter=None,
+                 cache=None, archive=None, offline=False):
+        self.timeout = timeout
+        self.limiter = limiter
+        self.cache = cache
+        self.archive = archive
+        self.offline = offline
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+
+        retry = LimitedRetry(
+            limiter=limiter,
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUS,
+            respect_retry_after_header=True,
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        self.stats = {
+            "requests": 0,
+            "wire_bytes": 0,
+            "body_bytes": 0,
+            "cache_miss": 0,
+            "cache_changed": 0,
+            "cache_not_modified": 0,
+            "cache_saved_bytes": 0,
+            "replayed": 0,
+        }
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return "<HttpClient requests:{} connections:{}>".format(self.stats["requests"], self.connections())
+
+    def get(self, url, headers=None):
+        if self.offline:
+            return self.replay(url)
+
+        response = self.fetch(url, headers)
+        if self.archive and response.status_code == 200:
+            self.archive.store(url, response.content)
+
+        return response
+
+    def replay(self, url):
+        '''Latest archived version of url as a 200 response'''
+        response = requests.models.Response()
+        response._content = self.archive.latest(url)
+        response.status_code = 200
+        response.url = url
+        response.encoding = "utf-8"
+
+        with self.lock:
+            self.stats["replayed"] += 1
+        return response
+
+    def fetch(self, url, headers=None):
+        headers = dict(headers or {})
+
+        cached = self.cache.load(url) if self.cache else None
+        if cached:
+            headers.update(cached.validators())
+
+        if self.limiter:
+            self.limiter.acquire()
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["body_bytes"] += len(response.content)
+            self.stats["wire_bytes"] += response.raw.tell() if response.raw else 0
+
+        if self.cache is None:
+            return response
+
+        if cached and response.status_code == 304:
+            with self.lock:
+                self.stats["cache_not_modified"] += 1
+                self.stats["cache_saved_bytes"] += len(cached.body)
+            return cached.to_response(response)
+
+        with self.lock:
+            self.stats["cache_changed" if cached else "cache_miss"] += 1
+        if response.status_code == 200:
+            self.cache.store(url, response)
+
+        return response
+
+    def connections(self):
+        '''Number of connections opened by all pools'''
+        pools = self.adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def report(self):
+        if self.offline:
+            print("Archive: replayed {} pages.".format(self.stats["replayed"]))
+            return
+
+        requests_count = self.stats["requests"]
+        connections = self.connections()
+        reused = max(requests_count - connections, 0)
+
+        print("HTTP: {} requests over {} connections ({} reused).".format(requests_count, connections, reused))
+        print("HTTP: {} transferred, {} decoded.".format(
+            format_bytes(self.stats["wire_bytes"]), format_bytes(self.stats["body_bytes"])))
+
+        if self.cache is not None:
+            print("HTTP cache: {} not modified (304), {} changed, {} misses. Saved {}.".format(
+                self.stats["cache_not_modified"], self.stats["cache_changed"], self.stats["cache_miss"],
+                format_bytes(self.stats["cache_saved_bytes"])))
+
+
+class CachedResponse:
+    '''Body and validators of a previous response for the same url'''
+
+    def __init__(self, meta, body):
+        self.meta = meta
+        self.body = body
+
+    def __repr__(self):
+        return "<CachedResponse {} etag:{}>".format(self.meta["url"], self.meta["etag"])
+
+    def validators(self):
+        headers = {}
+        if self.meta["etag"]:
+            headers["If-None-Match"] = self.meta["etag"]
+        if self.meta["last_modified"]:
+            headers["If-Modified-Since"] = self.meta["last_modified"]
+        return headers
+
+    def to_response(self, not_modified):
+        '''Rebuild a 200 response from the cached body and the 304 response'''
+        response = requests.models.Response()
+        response.status_code = 200
+        response.url = self.meta["url"]
+        response.encoding = self.meta["encoding"]
+        response.headers = CaseInsensitiveDict(self.meta["headers"])
+        response.headers.update(not_modified.headers)
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        response._content = self.body
+        return response
+
+
+class ResponseCache:
+    '''On-disk store of response bodies and their ETag/Last-Modified validators.
+
+    Each url is stored as two files named after the url hash: <hash>.json
+    with the validators and headers, and <hash>.body with the raw body.
+    '''
+
+    KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return "<ResponseCache {}>".format(self.directory)
+
+    def path(self, url, extension):
+        url_hash = hashlib.sha1(url.encode("utf8")).hexdigest()
+        return os.path.join(self.directory, url_hash + extension)
+
+    def load(self, url):
+        try:
+            with open(self.path(url, ".json"), "r") as meta_file:
+                meta = json.load(meta_file)
+            with open(self.path(url, ".body"), "rb") as body_file:
+                body = body_file.read()
+        except (OSError, ValueError):
+            return None
+
+        if meta["url"] != url:
+            return None
+        return CachedResponse(meta, body)
+
+    def store(self, url, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not (etag or last_modified):
+            return
+
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": response.encoding,
+            "headers": {k: v for k, v in response.headers.items() if k in self.KEPT_HEADERS},
+        }
+        _write_atomic(self.path(url, ".body"), response.content)
+        _write_atomic(self.path(url, ".json"), json.dumps(meta).encode("utf8"))
+
+
+class TokenBucket:
+    '''Rate limiter shared by all threads: `rate` requests per second, up to `burst` at once'''
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return "<TokenBucket rate:{}/s burst:{}>".format(self.rate, self.capacity)
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class LimitedRetry(Retry):
+    '''Retry that takes a token of limiter before every retry, so retries count towards DOWNLOAD_RATE'''
+
+    def __init__(self, *args, limiter=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+
+    def new(self, **kwargs):
+        # urllib3 makes a new Retry for every attempt
+        retry = super().new(**kwargs)
+        retry.limiter = self.limiter
+        return retry
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        if self.limiter:
+            self.limiter.acquire()
+
+
+def get_client():
+    '''Client shared by all threads of the current app, created on first use'''
+    client = app.extensions.get("http_client")
+    if client is None:
+        # Threads starting together must not build a client each
+        with _client_lock:
+            if "http_client" not in app.extensions:
+                app.extensions["http_client"] = make_client()
+            client = app.extensions["http_client"]
+    return client
+
+
+def make_client():
+    '''HttpClient configured with the settings of the current app'''
+    limiter = None
+    if app.config["DOWNLOAD_RATE"]:
+        limiter = TokenBucket(app.config["DOWNLOAD_RATE"], app.config["DOWNLOAD_BURST"])
+
+    cache = None
+    if app.config["HTTP_CACHE"]:
+        cache = ResponseCache(app.config["HTTP_CACHE_DIR"])
+
+    archive = None
+    if app.config["ARCHIVE"] or app.config["HTTP_OFFLINE"]:
+        archive = Archive(app.config["ARCHIVE_DIR"])
+
+    return HttpClient(
+        pool_size=max(app.config["HTTP_POOL_SIZE"], app.config["DOWNLOAD_WORKERS"]),
+        retries=app.config["HTTP_RETRIES"],
+        backoff_factor=app.config["HTTP_BACKOFF_FACTOR"],
+        timeout=app.config["HTTP_TIMEOUT"],
+        limiter=limiter,
+        cache=cache,
+        archive=archive,
+        offline=app.config["HTTP_OFFLINE"],
+    )
+
+
+def report():
+    if "http_client" in app.extensions:
+        app.extensions["http_client"].report()
+
+
+def _write_atomic(path, data):
+    tmp_path = "{}.{}.tmp".format(path, threading.get_ident())
+    with open(tmp_path, "wb") as tmp_file:
+        tmp_file.write(data)
+    os.replace(tmp_path, path)
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return "{:.1f} {}".format(size, unit)
+        size /= 1024
+    return "{:.1f} GB".format(size)
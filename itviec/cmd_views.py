@@ -6,13 +6,18 @@ from flask import Blueprint
 from flask import current_app as app
 
 import itviec.cache
+import itviec.client
 import itviec.stats
 import itviec.time
 from itviec.db import db
 from itviec import source
 from itviec.models import Job, Employer
-from itviec.composers import compose_employer, install_employer
-from itviec.upgrade import download, upgrade
+from itviec.bulk import load_employers
+from itviec.composers import install_employer
+from itviec.upgrade import download, upgrade, reparse
+from itviec.crawler import FeedCrawler
+from itviec.migrate import migrate_cache, migrate_dates, migrate_schema
+from itviec.store import BACKENDS
 
 
 # for debugging
@@ -28,6 +33,8 @@ def _init():
         app.config["CACHE_DIR"],
         app.config["JOBS_CACHE_DIR"],
         app.config["EMPLOYERS_CACHE_DIR"],
+        app.config["HTTP_CACHE_DIR"],
+        app.config["ARCHIVE_DIR"],
     )
 
     for directory in directories:
@@ -39,10 +46,64 @@ def _init():
     db.init_db()
 
 
+@cmd_bp.cli.command('migrate-dates')
+def _migrate_dates():
+    '''Convert string dates of a database and cache made by older versions'''
+    migrate_dates()
+
+
+@cmd_bp.cli.command('migrate-schema')
+def _migrate_schema():
+    '''Add the primary keys and indexes of the models to a database made by older versions'''
+    migrate_schema()
+
+
+@cmd_bp.cli.command('migrate-cache')
+@click.option('--source', type=click.Choice(BACKENDS), default="directory")
+@click.option('--target', type=click.Choice(BACKENDS), default="sqlite")
+def _migrate_cache(source, target):
+    '''Copy the jobs and employers cache to another backend'''
+    migrate_cache(source, target)
+
+
+@cmd_bp.cli.command('cache-index')
+def _cache_index():
+    '''Rebuild the metadata index of the jobs and employers cache'''
+    itviec.cache.rebuild_index()
+
+
+@cmd_bp.cli.command('cache-gc')
+@click.option('--dry-run', is_flag=True, help="Report what would be evicted without deleting it")
+@click.option('--ttl-days', type=int, default=None, help="Defaults to CACHE_TTL_DAYS")
+@click.option('--max-size', type=int, default=None, help="Bytes, defaults to CACHE_MAX_SIZE")
+def _cache_gc(dry_run, ttl_days, max_size):
+    '''Evict old jobs and employers from the cache'''
+    itviec.cache.collect_garbage(dry_run, ttl_days, max_size)
+
+
 @cmd_bp.cli.command('update')
-def _update():
+@click.option('--resume', is_flag=True, help="Go on from the last page of an interrupted update")
+def _update(resume):
     '''Download employer and job summary list'''
-    source.fetch_all()
+    source.fetch_all(resume)
+    itviec.client.report()
+
+
+@cmd_bp.cli.command('crawl')
+@click.option('--resume', is_flag=True, help="Go on from the last page of an interrupted crawl")
+def _crawl(resume):
+    '''Download job summary list and new jobs in a single pipeline'''
+    FeedCrawler(resume=resume).run()
+    itviec.client.report()
+
+
+@cmd_bp.cli.command('reparse')
+@click.option('--workers', type=int, default=None, help="Parser processes, defaults to CPU count")
+def _reparse(workers):
+    '''Rebuild the cache from archived pages without network access'''
+    app.config["HTTP_OFFLINE"] = True
+    reparse(workers)
+    itviec.client.report()
 
 
 @cmd_bp.cli.command('update-stats')
@@ -54,18 +115,14 @@ def _update_stats():
 @cmd_bp.cli.command('download')
 def _download():
     download()
+    itviec.client.report()
 
 
 @cmd_bp.cli.command('load')
-def _load():
+@click.option('--batch-size', type=int, default=None, help="Employers per transaction, defaults to BULK_BATCH_SIZE")
+def _load(batch_size):
     '''Load employers from newest jobs to oldest'''
-    for emp_code in source.get_employers_with_jobs():
-        print("# Employer: {}".format(emp_code))
-
-        employer = compose_employer(emp_code)
-
-        db.session.add(employer)
-        db.session.commit()
+    load_employers(source.get_employers_with_jobs(), batch_size)
 
 
 @cmd_bp.cli.command('install')
@@ -148,3 +205,4 @@ def _distance_histo():
 def _upgrade():
     download()
     upgrade()
+    itviec.client.report()
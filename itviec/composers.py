@@ -1,64 +1,21 @@
 from itviec import cache
-from itviec.db import db
-from itviec.helpers import to_json
-from itviec.models import Employer, Job, Tag, Address, Review
+from itviec.bulk import load_employers
+from itviec.models import Job
+from itviec.registry import get_registry
+from itviec.store import CacheMiss
 
 
 def install_employer(employer_code):
     print("Installing employer '{}'...".format(employer_code))
-    emp_d = cache.employer_cache_or_fetch(employer_code)
-
-    for job_tag in emp_d["jobs"]:
-        if not cache.is_job_cached(job_tag["code"]):
-            cache.fetch_job(job_tag["code"])
-
-    employer = compose_employer(employer_code)
-    db.session.add(employer)
-    db.session.commit()
-
-
-def compose_employer(employer_code):
-    employer_dict = cache.get_employer(employer_code)
-    compose_employer_reviews(employer_dict)
-    job_tags_to_jobs(employer_dict)
-    str_to_address(employer_dict)
-    str_to_tag(employer_dict)
-    employer_dict["why"] = to_json(employer_dict["why"], indent=None)
-
-    employer = Employer(**employer_dict)
-    return employer
-
-
-def compose_employer_reviews(employer):
-    reviews = []
-    for rev_d in employer["reviews"]:
-        rev_d["employer_code"] = employer["code"]
-        review = Review(**rev_d)
-        reviews.append(review)
-        db.session.add(review)
-    employer["reviews"] = reviews
-
-
-def job_tags_to_jobs(employer):
-    jobs = []
-    for job_tag in employer["jobs"]:
-        print("    \\- Job: {}".format(job_tag["code"]))
-
-        job = Job.query.filter(Job.code == job_tag["code"]).first()
-        if job is None:
-            job = compose_job(job_tag)
-            db.session.add(job)
-
-        jobs.append(job)
-        db.session.commit()
-
-    employer["jobs"] = jobs
+    cache.employer_cache_or_fetch(employer_code)
+    load_employers([employer_code])
 
 
 def compose_job(job_tag):
+    '''New Job of a cached job, for the updates staged in update.py'''
     try:
         job_d = cache.get_job(job_tag["code"])
-    except OSError:
+    except CacheMiss:
         cache.fetch_job(job_tag["code"])
         job_d = cache.get_job(job_tag["code"])
 
@@ -74,34 +31,12 @@ def compose_job(job_tag):
 
 
 def str_to_tag(item):
-    tag_list = []
-    for tag_name in item["tags"]:
-        tag = db.session.query(Tag).filter_by(name=tag_name).first()
-        if tag is None:
-            tag = Tag(name=tag_name)
-            db.session.add(tag)
-        tag_list.append(tag)
-    item["tags"] = tag_list
+    registry = get_registry()
+    # Links are unique, repeated names are linked once
+    item["tags"] = [registry.tag(tag_name) for tag_name in dict.fromkeys(item["tags"])]
 
 
 def str_to_address(item):
-    addr_list = []
-    for full_addr in item["addresses"]:
-        if full_addr == '':
-            continue
-        addr = db.session.query(Address).filter_by(full_address=full_addr).first()
-        if addr is None:
-            try:
-                addr_list = full_addr.split(", ")[-2:]
-                city = addr_list.pop()
-                if len(addr_list):
-                    district = addr_list.pop()
-                    addr = Address(full_address=full_addr, city=city, district=district)
-                else:
-                    addr = Address(full_address=full_addr, city=city)
-            except ValueError:
-                print("Address: '{}'".format(full_addr))
-                raise
-            db.session.add(addr)
-        addr_list.append(addr)
-    item["addresses"] = addr_list
+    registry = get_registry()
+    item["addresses"] = [registry.address(full_addr) for full_addr in dict.fromkeys(item["addresses"])
+                         if full_addr != '']
@@ -0,0 +1,145 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app as app
+
+import itviec.cache
+import itviec.source
+from itviec.feeds import JobsFeed, build_job_page
+from itviec.helpers import fetch_url
+from itviec.parsers import parse_job_cards
+
+
+def fetch_page(url):
+    response = fetch_url(url)
+    return build_job_page(url, response.json())
+
+
+def parse_page(page):
+    return parse_job_cards(page.content)
+
+
+def missing_job_codes(job_tags):
+    '''Codes of the job tags not in the cache or cached before their last post'''
+    return [job_tag["code"] for job_tag in job_tags if not itviec.cache.is_job_cache_hit(job_tag)]
+
+
+class FeedCrawler:
+    '''Streaming crawl of the jobs feed and the details of its jobs.
+
+    Feed pages, job tag parsing and job downloads are stages of a single
+    asyncio pipeline connected by bounded queues, so new feed pages are
+    requested while the jobs of previous pages are still downloading.
+    Blocking work (requests, parsing and disk access) runs in a thread pool.
+    The first failing stage stops the crawl and its error is raised.
+
+    crawler = FeedCrawler()
+    job_tags = crawler.run()
+
+    Job tags are written to the feed snapshot page by page. With resume the
+    crawl goes on from the last page written by an interrupted one.
+    '''
+
+    def __init__(self, feed=None, workers=None, queue_size=None, resume=False):
+        self.feed = feed or JobsFeed()
+        self.workers = workers or app.config["DOWNLOAD_WORKERS"]
+        self.queue_size = queue_size or app.config["CRAWL_QUEUE_SIZE"]
+        self.resume = resume
+        self.app = app._get_current_object()
+        self.executor = None
+        self.snapshot = None
+
+        self.job_tags = []
+        self.downloaded = []
+
+    def __repr__(self):
+        return "<FeedCrawler jobs:{} downloaded:{}>".format(len(self.job_tags), len(self.downloaded))
+
+    def run(self):
+        self.snapshot = itviec.source.FeedSnapshotWriter(self.app.config["JOBS_JSON_FILE"])
+        url = self.snapshot.open(self.resume)
+        if url is None:
+            url = self.feed.url()
+        else:
+            # Jobs of the written pages may not have been downloaded yet
+            self.job_tags = list(itviec.source.iter_job_tags(self.snapshot.part_path))
+            print("Resuming after {} jobs.".format(len(self.job_tags)))
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.crawl(url))
+        finally:
+            loop.close()
+        print("")
+
+        self.snapshot.close()
+        print("Found {} jobs, downloaded {}.".format(len(self.job_tags), len(self.downloaded)))
+
+        return self.job_tags
+
+    async def crawl(self, url):
+        pages = asyncio.Queue(maxsize=self.queue_size)
+        jobs = asyncio.Queue(maxsize=self.queue_size)
+
+        # A thread for every job fetcher, the feed page fetcher and the parser
+        with ThreadPoolExecutor(max_workers=self.workers + 2) as executor:
+            self.executor = executor
+            tasks = [asyncio.ensure_future(self.fetch_jobs(jobs)) for _ in range(self.workers)]
+            tasks.append(asyncio.ensure_future(self.fetch_pages(pages, url)))
+            tasks.append(asyncio.ensure_future(self.parse_pages(pages, jobs, list(self.job_tags))))
+            try:
+                # A failed stage would leave the others waiting on its queue forever
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    task.result()
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    def run_in_thread(self, func, *args):
+        def call():
+            with self.app.app_context():
+                return func(*args)
+
+        return asyncio.get_event_loop().run_in_executor(self.executor, call)
+
+    async def fetch_pages(self, pages, url):
+        while url:
+            page = await self.run_in_thread(fetch_page, url)
+            await pages.put(page)
+            url = page.next_p
+        await pages.put(None)
+
+    async def parse_pages(self, pages, jobs, resumed_job_tags=()):
+        await self.queue_downloads(resumed_job_tags, jobs)
+
+        while True:
+            page = await pages.get()
+            if page is None:
+                break
+
+            print(".", end='', flush=True)
+            job_tags = await self.run_in_thread(parse_page, page)
+            await self.run_in_thread(self.snapshot.write_page, job_tags, page.next_p)
+            self.job_tags.extend(job_tags)
+            await self.queue_downloads(job_tags, jobs)
+
+        for _ in range(self.workers):
+            await jobs.put(None)
+
+    async def queue_downloads(self, job_tags, jobs):
+        for job_code in await self.run_in_thread(missing_job_codes, job_tags):
+            await jobs.put(job_code)
+
+    async def fetch_jobs(self, jobs):
+        while True:
+            job_code = await jobs.get()
+            if job_code is None:
+                return
+
+            try:
+                await self.run_in_thread(itviec.cache.fetch_job, job_code)
+            except KeyError as e:
+                print(e)
+                continue
+            self.downloaded.append(job_code)
@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -16,6 +18,9 @@ class Database():
         print("Using database engine: {}".format(uri))
         self.engine = create_engine(uri, echo=echo)
         session = self.get_session()
+        # Sessions of a previous app must not keep using the old engine
+        session.remove()
+        session.configure(bind=self.engine)
         self.base.query = session.query_property()
 
     def get_session(self):
@@ -52,4 +57,72 @@ class Database():
         self.base.metadata.create_all(bind=self.engine)
 
 
+class UnitOfWork():
+    '''Stage changes in a session and commit them every `size` steps.
+
+    With size 0 everything is committed once, when the block ends. An
+    exception rolls back the changes since the last commit only. Every flush
+    of the session is timed, the ones run inside a step included, and the
+    stats are printed when the block ends.
+    '''
+
+    def __init__(self, session, size=0):
+        self.session = session
+        self.size = size
+        self.steps = 0
+        self.pending = 0
+        self.commits = 0
+        self.flush_time = 0
+        self.commit_time = 0
+        self._flush_start = None
+
+    def __enter__(self):
+        # Events are listened on the Session of the thread, not the registry
+        target = self.session() if isinstance(self.session, scoped_session) else self.session
+        self._events = [(target, "before_flush", self._before_flush), (target, "after_flush", self._after_flush)]
+        for args in self._events:
+            event.listen(*args)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                print("Rolling back {} uncommitted steps.".format(self.pending))
+                self.session.rollback()
+        finally:
+            for args in self._events:
+                event.remove(*args)
+            self.report()
+
+    def _before_flush(self, session, flush_context, instances):
+        self._flush_start = time.perf_counter()
+
+    def _after_flush(self, session, flush_context):
+        self.flush_time += time.perf_counter() - self._flush_start
+
+    def step(self):
+        self.steps += 1
+        self.pending += 1
+        if self.size and self.pending >= self.size:
+            self.commit()
+
+    def commit(self):
+        if not self.pending:
+            return
+
+        start = time.perf_counter()
+        flush_time = self.flush_time
+        self.session.commit()
+        # The flush run by commit is already counted in flush_time
+        self.commit_time += time.perf_counter() - start - (self.flush_time - flush_time)
+        self.commits += 1
+        self.pending = 0
+
+    def report(self):
+        print("{} steps in {} commits, {:.2f}s flushing, {:.2f}s committing.".format(
+            self.steps - self.pending, self.commits, self.flush_time, self.commit_time))
+
+
 db = Database()
@@ -0,0 +1,94 @@
+import gzip
+import io
+import json
+
+from itviec.helpers import json_default
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Cache encodings, see CACHE_ENCODING. "json" is the unversioned legacy format.
+ENCODINGS = ("json", "json.gz", "msgpack.gz")
+
+# Versioned encodings start with MAGIC and a "<version> <encoding>\n" header
+MAGIC = b"\x89ITV"
+VERSION = 1
+
+# Encodings already reported as unavailable
+_missing = set()
+
+
+def get_encoding(encoding):
+    '''encoding, or json.gz if the packages it needs are not installed'''
+    if encoding not in ENCODINGS:
+        raise ValueError("Unknown CACHE_ENCODING '{}'. Valid encodings are {}.".format(encoding, ", ".join(ENCODINGS)))
+
+    if encoding == "msgpack.gz" and msgpack is None:
+        if encoding not in _missing:
+            _missing.add(encoding)
+            print("Cache encoding '{}' needs msgpack, which is not installed, using 'json.gz'.".format(encoding))
+        return "json.gz"
+
+    return encoding
+
+
+def encode(item, encoding="json", indent=None):
+    '''bytes of item in encoding, indent only applies to legacy json'''
+    if encoding == "json":
+        return dump_json(item, indent)
+
+    if encoding == "json.gz":
+        payload = dump_json(item)
+    elif encoding == "msgpack.gz":
+        payload = msgpack.packb(item, default=json_default)
+    else:
+        raise ValueError("Unknown cache encoding '{}'".format(encoding))
+
+    header = MAGIC + "{} {}\n".format(VERSION, encoding).encode("ascii")
+    # No timestamp in the gzip header, equal items are equal bytes. gzip.compress
+    # only takes mtime from Python 3.8.
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=6, mtime=0) as gzip_file:
+        gzip_file.write(payload)
+    return header + buffer.getvalue()
+
+
+def decode(data):
+    '''Item of data in any encoding, versioned or legacy json'''
+    if not data.startswith(MAGIC):
+        return load_json(data)
+
+    header, payload = data.split(b"\n", 1)
+    version, encoding = header[len(MAGIC):].decode("ascii").split(" ")
+    if int(version) > VERSION:
+        raise ValueError("Cache encoding version {} is newer than this version of itviec".format(version))
+
+    if encoding == "json.gz":
+        return load_json(gzip.decompress(payload))
+    if encoding == "msgpack.gz":
+        if msgpack is None:
+            raise ValueError("Cache encoding '{}' needs msgpack, which is not installed".format(encoding))
+        return msgpack.unpackb(gzip.decompress(payload), raw=False)
+    raise ValueError("Unknown cache encoding '{}'".format(encoding))
+
+
+def dump_json(item, indent=None):
+    '''Sorted UTF-8 JSON, with orjson if installed'''
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_SORT_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(item, default=json_default, option=option)
+
+    return json.dumps(item, sort_keys=True, indent=indent, ensure_ascii=False, default=json_default).encode("utf8")
+
+
+def load_json(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
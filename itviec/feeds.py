@@ -1,7 +1,13 @@
-from bs4 import BeautifulSoup
+import queue
+import threading
+
+from bs4 import SoupStrainer
 from flask import current_app as app
 
 from itviec.helpers import fetch_url
+from itviec.soup import make_soup
+
+REVIEW_PAGINATION_ONLY = SoupStrainer("ul", class_="pagination")
 
 
 # Employers feed
@@ -43,11 +49,15 @@ class JobsFeed:
     feed = JobsFeed()
     for page in feed:
         print(page)
+
+    With prefetch=N (default FEED_PREFETCH_DEPTH) up to N pages are fetched
+    in the background while the current one is being processed.
     '''
 
     def __init__(self, **kwargs):
         self.location = ''
         self.tags = ''
+        self.prefetch = app.config["FEED_PREFETCH_DEPTH"]
 
         if 'location' in kwargs:
             self.location = kwargs['location']
@@ -55,6 +65,9 @@ class JobsFeed:
         if 'tags' in kwargs:
             self.tags = kwargs['tags']
 
+        if 'prefetch' in kwargs:
+            self.prefetch = kwargs['prefetch']
+
     def url(self):
         feed_url = app.config["JOBS_URL"]
         if self.tags:
@@ -67,13 +80,14 @@ class JobsFeed:
         return "<Feed location='{}' tags='{}'>".format(self.location, self.tags)
 
     def __iter__(self):
-        return JobPageIterator(self.url())
+        return self.pages()
 
-    def pages(self):
-        return JobPageIterator(self.url())
+    def pages(self, url=None):
+        '''Pages from url, by default the first one'''
+        return prefetch(JobPageIterator(url or self.url()), self.prefetch)
 
     def job_tags(self):
-        for page in JobPageIterator(self.url()):
+        for page in self.pages():
             for job_tag in page:
                 yield job_tag
 
@@ -90,35 +104,39 @@ class JobPageIterator:
             raise StopIteration("Error: No URL for current iteration")
 
         response = fetch_url(self.url)
-        resp_json = response.json()
+        page = build_job_page(self.url, response.json())
 
-        # Key:  suggestion
-        # Key:  show_more_html
-        # Key:  jobs_html
+        self.url = page.next_p
 
-        # 1.- Next URL
-        next_url_block = resp_json["show_more_html"]
-        soup = BeautifulSoup(next_url_block, "html.parser")
+        return page
 
-        # Define the local variable
-        next_url = None
-        prev_url = None
 
-        # Get next page url if exists
-        a = soup.find("a", href=True, rel="next")
-        next_url = a["href"] if type(a).__name__ is "Tag" else ""
+def build_job_page(url, resp_json):
+    '''Build a JobPage from the JSON response of a jobs feed url'''
 
-        # Get previous page url if exists
-        for a in soup.find_all("a", href=True, rel="prev"):
-            prev_url = a["href"]
-            break
+    # Key:  suggestion
+    # Key:  show_more_html
+    # Key:  jobs_html
 
-        # Build page
-        page = JobPage(self.url, resp_json["jobs_html"], prev_url, next_url)
+    # 1.- Next URL
+    next_url_block = resp_json["show_more_html"]
+    soup = make_soup(next_url_block)
 
-        self.url = next_url
+    # Define the local variable
+    next_url = None
+    prev_url = None
 
-        return page
+    # Get next page url if exists
+    a = soup.find("a", href=True, rel="next")
+    next_url = a["href"] if type(a).__name__ is "Tag" else ""
+
+    # Get previous page url if exists
+    for a in soup.find_all("a", href=True, rel="prev"):
+        prev_url = a["href"]
+        break
+
+    # Build page
+    return JobPage(url, resp_json["jobs_html"], prev_url, next_url)
 
 
 class JobPage:
@@ -143,7 +161,7 @@ class JobTagIterator:
         elif content.__class__.__name__ == "Tag":
             self.job_panel_tag = content
         else:
-            self.job_panel_tag = BeautifulSoup(content, "html.parser")
+            self.job_panel_tag = make_soup(content)
 
         self.next_block = self.job_panel_tag.div
 
@@ -162,17 +180,21 @@ class JobTagIterator:
 # Reviews Feed
 class ReviewsFeed:
 
-    def __init__(self, code):
+    def __init__(self, code, prefetch=None):
         self.code = code
+        self.prefetch = app.config["FEED_PREFETCH_DEPTH"] if prefetch is None else prefetch
 
     def url(self):
         return app.config["TEMPLATE_EMPLOYER_REVIEW_URL"].format(self.code)
 
     def __iter__(self):
-        return ReviewPageIterator(self.url())
+        return self.pages()
+
+    def pages(self):
+        return prefetch(ReviewPageIterator(self.url()), self.prefetch)
 
     def reviews(self):
-        for page in ReviewPageIterator(self.url()):
+        for page in self.pages():
             for review_tag in page:
                 yield review_tag
 
@@ -190,23 +212,37 @@ class ReviewPageIterator:
             raise StopIteration("Error: No URL for current iteration")
 
         response = fetch_url(self.url)
-        prev_url = None
-        next_url = None
+        page = build_review_page(self.url, response.text)
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        review_panel_tag = soup.find("div", class_="panel-body content-review disable-user-select")
-        pagination_tag = soup.find("ul", class_="pagination")
+        self.url = page.next_p
 
-        if pagination_tag:
-            a_tag = pagination_tag.find("a", rel="next")
-            if a_tag:
-                next_url = app.config["BASE_URL"] + a_tag["href"]
+        return page
 
-        page = ReviewPage(self.url, review_panel_tag, prev_url, next_url)
 
-        self.url = next_url
+def build_review_page(url, html):
+    '''Build a ReviewPage from the html of an employer reviews url'''
+    prev_url = None
+
+    soup = make_soup(html)
+    review_panel_tag = soup.find("div", class_="panel-body content-review disable-user-select")
+    next_url = _get_next_review_url(soup)
+
+    return ReviewPage(url, review_panel_tag, prev_url, next_url)
+
+
+def get_next_review_url(html):
+    '''Next page url of an employer reviews page, parsing only its pagination'''
+    return _get_next_review_url(make_soup(html, parse_only=REVIEW_PAGINATION_ONLY))
 
-        return page
+
+def _get_next_review_url(soup):
+    pagination_tag = soup.find("ul", class_="pagination")
+
+    if pagination_tag:
+        a_tag = pagination_tag.find("a", rel="next")
+        if a_tag:
+            return app.config["BASE_URL"] + a_tag["href"]
+    return None
 
 
 class ReviewIterator:
@@ -235,3 +271,78 @@ class ReviewPage(JobPage):
 
     def __repr__(self):
         return "<ReviewPage url:{} next:{}>".format(self.url, self.next_p)
+
+
+# Prefetching
+def prefetch(pages, depth):
+    if depth:
+        return PrefetchIterator(pages, depth)
+    return pages
+
+
+class PrefetchIterator:
+    '''Wraps a page iterator to fetch up to `depth` pages ahead in a background thread.
+
+    A page's next url is only known once the page is parsed, so the thread
+    fetches and parses pages in order while the caller processes earlier ones.
+    Errors in the thread are raised again by __next__.
+    '''
+
+    def __init__(self, pages, depth=1):
+        self.queue = queue.Queue(maxsize=depth)
+        self.stopped = threading.Event()
+        self.finished = False
+
+        # The thread must not reference self, so abandoned iterators get closed
+        args = (app._get_current_object(), pages, self.queue, self.stopped)
+        self.thread = threading.Thread(target=_prefetch_pages, args=args, daemon=True)
+        self.thread.start()
+
+    def __repr__(self):
+        return "<PrefetchIterator depth:{} ready:{}>".format(self.queue.maxsize, self.queue.qsize())
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.finished:
+            raise StopIteration("No more pages")
+
+        item = self.queue.get()
+        if item is _END_OF_PAGES:
+            self.finished = True
+            raise StopIteration("No more pages")
+        if isinstance(item, BaseException):
+            self.finished = True
+            raise item
+        return item
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        self.stopped.set()
+
+
+_END_OF_PAGES = object()
+
+
+def _prefetch_pages(flask_app, pages, page_queue, stopped):
+    def put(item):
+        while not stopped.is_set():
+            try:
+                page_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    with flask_app.app_context():
+        try:
+            for page in pages:
+                if not put(page):
+                    return
+        except BaseException as e:
+            put(e)
+            return
+        put(_END_OF_PAGES)
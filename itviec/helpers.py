@@ -1,7 +1,9 @@
 import requests
 import json
+from datetime import date
 
 import config
+from itviec.client import get_client
 
 VIETNAMESE_CHARACTERS = "ăắằẳẵặâấầẩẫậĐđêếềểễệôốồổỗộơớờởỡợưứừửữự"
 
@@ -35,7 +37,7 @@ def fetch_url(url, headers=None):
         headers = config.req_http_headers
 
     try:
-        response = requests.get(url, headers=headers)
+        response = get_client().get(url, headers=headers)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(e)
@@ -48,11 +50,18 @@ def fetch_url(url, headers=None):
     return response
 
 
+def json_default(value):
+    '''Timestamps are written as ISO 8601 strings'''
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError("Object of type {} is not JSON serializable".format(class_name(value)))
+
+
 def to_json(to_json, indent=2):
-    return json.dumps(to_json, sort_keys=True, indent=indent, ensure_ascii=False)
+    return json.dumps(to_json, sort_keys=True, indent=indent, ensure_ascii=False, default=json_default)
 
 
 def to_json_file(to_json, filename):
     with open(filename, 'wb') as json_file:
-        s = json.dumps(to_json, sort_keys=True, indent=2, ensure_ascii=False)
+        s = json.dumps(to_json, sort_keys=True, indent=2, ensure_ascii=False, default=json_default)
         json_file.write(s.encode('utf8'))
@@ -0,0 +1,138 @@
+import os
+
+from flask import current_app as app
+from sqlalchemy import bindparam, inspect, text
+
+import itviec.cache
+import itviec.source
+from itviec.db import db
+from itviec.models import Employer, Job, Review
+from itviec.models import employer_address, employer_tag, job_address, job_tag
+from itviec.store import SqliteDatabase, get_store, make_store
+from itviec.time import parse_timestamp
+
+# Columns stored as strings before they were DateTime
+DATE_COLUMNS = (
+    (Employer.__table__, ("last_update", "last_post")),
+    (Job.__table__, ("last_update", "last_post")),
+    (Review.__table__, ("date", "last_update")),
+)
+
+
+def migrate_dates():
+    '''Convert the string dates of an existing database and cache to timestamps'''
+    if db.engine.dialect.name != "sqlite":
+        print("Date migration is only supported on sqlite databases.")
+        exit(1)
+
+    with db.engine.begin() as conn:
+        for table, columns in DATE_COLUMNS:
+            count = _migrate_date_columns(conn, table, columns)
+            print("Converted dates of {} rows in table '{}'.".format(count, table.name))
+        _create_indexes(conn, [table for table, _ in DATE_COLUMNS])
+
+    migrate_cache_dates()
+
+
+def migrate_schema():
+    '''Add the primary keys and indexes of the models to an existing database'''
+    if db.engine.dialect.name != "sqlite":
+        print("Schema migration is only supported on sqlite databases.")
+        exit(1)
+
+    with db.engine.begin() as conn:
+        for table in (employer_address, employer_tag, job_address, job_tag):
+            if not inspect(conn).get_pk_constraint(table.name)["constrained_columns"]:
+                removed = _rebuild_link_table(conn, table)
+                print("Added the primary key of table '{}', removed {} duplicate links.".format(table.name, removed))
+        _create_indexes(conn, db.base.metadata.sorted_tables)
+        # Table statistics let the query planner choose between the new indexes
+        conn.execute(text("ANALYZE"))
+
+
+def _rebuild_link_table(conn, table):
+    '''Copy the distinct links of table between existing rows into a new one with its primary key'''
+    # sqlite can't add a primary key to a table, it is created again
+    old_name = table.name + "_old"
+    conn.execute(text("ALTER TABLE {} RENAME TO {}".format(table.name, old_name)))
+    table.create(bind=conn)
+
+    columns = ", ".join(column.name for column in table.columns)
+    # Links to deleted rows and NULL links are dropped
+    exists = " AND ".join("{} IN (SELECT {} FROM {})".format(column.name, fk.column.name, fk.column.table.name)
+                          for column in table.columns for fk in column.foreign_keys)
+    conn.execute(text("INSERT OR IGNORE INTO {} ({}) SELECT {} FROM {} WHERE {}".format(
+        table.name, columns, columns, old_name, exists)))
+
+    count = conn.execute(text("SELECT count(*) FROM {}".format(old_name))).scalar()
+    conn.execute(text("DROP TABLE {}".format(old_name)))
+    return count - conn.execute(table.count()).scalar()
+
+
+def _migrate_date_columns(conn, table, columns):
+    # Read the raw strings, DateTime columns can't load the old formats
+    query = text("SELECT id, {} FROM {}".format(", ".join(columns), table.name))
+
+    rows = []
+    for row in conn.execute(query):
+        values = {"_id": row[0]}
+        for name, value in zip(columns, row[1:]):
+            values[name] = parse_timestamp(value)
+        rows.append(values)
+
+    if rows:
+        update = table.update().where(table.c.id == bindparam("_id"))
+        update = update.values({name: bindparam(name) for name in columns})
+        conn.execute(update, rows)
+    return len(rows)
+
+
+def _create_indexes(conn, tables):
+    inspector = inspect(conn)
+    for table in tables:
+        existing = set(index["name"] for index in inspector.get_indexes(table.name))
+        for index in table.indexes:
+            if index.name not in existing:
+                print("Creating index {}".format(index.name))
+                index.create(bind=conn)
+
+
+def migrate_cache_dates():
+    '''Rewrite cached items with ISO timestamps'''
+    if os.path.isfile(app.config["JOBS_JSON_FILE"]):
+        # Streamed, the snapshot is replaced only once fully written
+        itviec.source.write_job_tags(itviec.source.iter_job_tags())
+
+    count = 0
+    for kind, get_item in (("jobs", itviec.cache.get_job), ("employers", itviec.cache.get_employer)):
+        store = get_store(kind)
+        for codes in _batches(store.codes()):
+            store.put_many({code: get_item(code) for code in codes})
+            count += len(codes)
+
+    print("Converted dates of {} cached items.".format(count))
+
+
+def migrate_cache(source="directory", target="sqlite"):
+    '''Copy the jobs and employers cache from one backend to another.
+
+    Items are written in CACHE_ENCODING, with the same source and target
+    backend the cache is encoded again in place.
+    '''
+    for kind in ("jobs", "employers"):
+        source_store = make_store(kind, source)
+        target_store = make_store(kind, target)
+
+        count = 0
+        for codes in _batches(source_store.codes()):
+            target_store.put_many(source_store.get_many(codes))
+            count += len(codes)
+        print("Copied {} {} from {} to {}.".format(count, kind, source_store, target_store))
+
+    if app.config["CACHE_BACKEND"] != target:
+        print("Set CACHE_BACKEND = \"{}\" in the instance config to use the copy.".format(target))
+
+
+def _batches(codes, size=SqliteDatabase.BATCH_SIZE):
+    for start in range(0, len(codes), size):
+        yield codes[start:start + size]
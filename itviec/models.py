@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Table, ForeignKey
-from sqlalchemy import Integer, Float, String, Text, Boolean
+from sqlalchemy import Integer, Float, String, Text, Boolean, DateTime
 from sqlalchemy.orm import relationship, backref
 
 import config
@@ -7,24 +7,25 @@ from itviec.db import db
 
 from pprint import pprint
 
+# Links are unique, the primary key serves lookups by owner, the index by target
 job_address = Table('job_address', db.base.metadata,
-                    Column('job_id', Integer, ForeignKey('job.id')),
-                    Column('address_id', Integer, ForeignKey('address.id'))
+                    Column('job_id', Integer, ForeignKey('job.id'), primary_key=True),
+                    Column('address_id', Integer, ForeignKey('address.id'), primary_key=True, index=True)
                     )
 
 employer_address = Table('employer_address', db.base.metadata,
-                         Column('employer_id', Integer, ForeignKey('employer.id')),
-                         Column('address_id', Integer, ForeignKey('address.id'))
+                         Column('employer_id', Integer, ForeignKey('employer.id'), primary_key=True),
+                         Column('address_id', Integer, ForeignKey('address.id'), primary_key=True, index=True)
                          )
 
 job_tag = Table('job_tag', db.base.metadata,
-                Column('job_id', Integer, ForeignKey('job.id')),
-                Column('tag_id', Integer, ForeignKey('tag.id'))
+                Column('job_id', Integer, ForeignKey('job.id'), primary_key=True),
+                Column('tag_id', Integer, ForeignKey('tag.id'), primary_key=True, index=True)
                 )
 
 employer_tag = Table('employer_tag', db.base.metadata,
-                     Column('employer_id', Integer, ForeignKey('employer.id')),
-                     Column('tag_id', Integer, ForeignKey('tag.id'))
+                     Column('employer_id', Integer, ForeignKey('employer.id'), primary_key=True),
+                     Column('tag_id', Integer, ForeignKey('tag.id'), primary_key=True, index=True)
                      )
 
 
@@ -44,8 +45,8 @@ class Employer(db.base):
     overtime = Column(String(128))
     website = Column(String(128))
 
-    last_update = Column(String(32), nullable=False)
-    last_post = Column(String(32), nullable=False)
+    last_update = Column(DateTime, nullable=False)
+    last_post = Column(DateTime, nullable=False, index=True)
 
     review_count = Column(Integer)
     review_ratings = Column(Float)
@@ -81,11 +82,11 @@ class Job(db.base):
 
     title = Column(String(128), nullable=False)
     salary = Column(String(128), nullable=False)
-    employer_code = Column(String(128), ForeignKey('employer.code'), nullable=False)
+    employer_code = Column(String(128), ForeignKey('employer.code'), nullable=False, index=True)
 
     # Time registers
-    last_update = Column(String(128), nullable=False)
-    last_post = Column(String(128), nullable=False)
+    last_update = Column(DateTime, nullable=False, index=True)
+    last_post = Column(DateTime, nullable=False, index=True)
 
     # Descriptive long texts
     description = Column(Text, nullable=False)
@@ -168,9 +169,9 @@ class Review(db.base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String(128))
-    date = Column(String(128))
-    employer_code = Column(String(128), ForeignKey('employer.code'), nullable=False)
-    last_update = Column(String(128))
+    date = Column(DateTime, index=True)
+    employer_code = Column(String(128), ForeignKey('employer.code'), nullable=False, index=True)
+    last_update = Column(DateTime)
     liked = Column(Text())
     hated = Column(Text())
     recommend = Column(Boolean(), nullable=False)
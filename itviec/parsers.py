@@ -1,14 +1,21 @@
-import os
 import json
+import re
 from datetime import timedelta
 
 from flask import current_app as app
-from bs4 import BeautifulSoup, Comment
+from bs4 import Comment, SoupStrainer, Tag
 
-from itviec.feeds import ReviewsFeed
+from itviec.feeds import PrefetchIterator, ReviewsFeed, build_review_page
 from itviec.helpers import fetch_url, to_json_file, to_json
-from itviec.time import str_to_datetime
-from itviec.feeds import JobTagIterator
+from itviec.soup import make_soup
+from itviec.store import get_store
+from itviec.time import parse_timestamp
+
+# Page parts read by the page parsers, other parts are not built
+JOB_PAGE_ONLY = SoupStrainer("div", class_="content")
+EMPLOYER_PAGE_ONLY = SoupStrainer("div", class_="company-page")
+# The class attribute is matched as a whole string while parsing
+REVIEW_SUMMARY_ONLY = SoupStrainer("div", class_=re.compile(r"\bshort-summary\b"))
 
 
 def is_last_updated(tag):
@@ -43,11 +50,13 @@ class EmployerParser:
     def fetch_and_parse(self):
         url = self.get_url()
         response = fetch_url(url)
+        self.parse(response.text, url)
 
-        if response.text.find('employers_show') is -1:
-            raise KeyError("Employer '{}' not found at {}".format(self.code, url))
+    def parse(self, html, url=None):
+        if html.find('employers_show') is -1:
+            raise KeyError("Employer '{}' not found at {}".format(self.code, url or self.get_url()))
 
-        self.emp.update(self.parse_employer_page(response.text))
+        self.emp.update(self.parse_employer_page(html))
 
     def digest(self):
         self.emp["overview"] = "<overview len={}>".format(len(self.emp["overview"]))
@@ -57,15 +66,44 @@ class EmployerParser:
             jobs.append("<Job:{}>".format(job["url"]))
         self.emp["jobs"] = jobs
 
-    def fetch_and_parse_reviews(self):
-        feed = ReviewsFeed(self.code)
-        for review_tag in feed.reviews():
-            try:
-                rev_p = ReviewParser(review_tag)
-                self.emp["reviews"].append(rev_p.get_dict())
-            except KeyError:
-                print(review_tag)
-                raise
+    def fetch_and_parse_reviews(self, known=None):
+        '''Parse every reviews page, or with known reviews, stop at the first
+        page ending with a known review and merge the known ones.
+
+        Reviews are listed newest first, so the pages after it have no new reviews.
+        '''
+        known_keys = set(review_key(review) for review in known or ())
+
+        pages = ReviewsFeed(self.code).pages()
+        for page in pages:
+            for review_tag in page:
+                self._add_review(review_tag)
+            if ends_with_known_review(page, known_keys):
+                break
+        if isinstance(pages, PrefetchIterator):
+            pages.close()
+
+        if known:
+            self.merge_reviews(known)
+
+    def parse_reviews_page(self, url, html):
+        for review_tag in build_review_page(url, html):
+            self._add_review(review_tag)
+
+    def merge_reviews(self, known):
+        '''Append the known reviews that were not parsed again, parsed copies replace edited ones'''
+        parsed_keys = set(review_key(review) for review in self.emp["reviews"])
+        for review in known:
+            if review_key(review) not in parsed_keys:
+                self.emp["reviews"].append(review)
+
+    def _add_review(self, review_tag):
+        try:
+            rev_p = ReviewParser(review_tag)
+            self.emp["reviews"].append(rev_p.get_dict())
+        except KeyError:
+            print(review_tag)
+            raise
 
     def parse_employer_page(self, html):
         '''Div: company-page
@@ -94,7 +132,7 @@ class EmployerParser:
         }
 
         try:
-            soup = BeautifulSoup(html, "html.parser")
+            soup = make_soup(html, parse_only=EMPLOYER_PAGE_ONLY)
             company_tag = soup.find("div", class_="company-page")
             header_tag = company_tag.select("div.headers.hidden-xs")[0]
         except AttributeError as e:
@@ -154,7 +192,7 @@ class EmployerParser:
         left_column = company_tag.find(class_="col-md-8 col-left")
         for child in left_column.children:
             if is_last_updated(child):
-                return get_last_updated(child)
+                return parse_timestamp(get_last_updated(child))
 
     def _parse_header(self, header_tag):
         emp = {}
@@ -243,17 +281,12 @@ class EmployerParser:
         tags = []
         skills_tag = panel_tag.find("ul", class_="employer-skills")
         for skill_link in skills_tag.find_all("a"):
-            tags.append(skill_link.string)
+            tags.append(str(skill_link.string))
         return tags
 
     def _parse_jobs_panel(self, panel_tag):
-        jobs = []
         panel_body_tag = panel_tag.find(class_="panel-body")
-        for job_tag in JobTagIterator(panel_body_tag):
-            job_d = JobTagParser(job_tag).get_dict()
-            jobs.append(job_d)
-
-        return jobs
+        return parse_job_cards(panel_body_tag)
 
     def _parse_why_panel(self, panel_tag):
 
@@ -315,9 +348,40 @@ class EmployerParser:
         return to_json(self.emp)
 
     def save_json(self):
-        filename = "{}.json".format(self.emp["code"])
-        filepath = os.path.join(app.config["EMPLOYERS_CACHE_DIR"], filename)
-        to_json_file(self.get_dict(), filepath)
+        get_store("employers").put(self.emp["code"], self.get_dict())
+
+
+def review_key(review):
+    '''Identity of a review dict, stable across crawls and edits'''
+    return (review["title"], review["date"])
+
+
+def review_tag_key(review_tag):
+    '''review_key of a review tag or of its summary, reading only its title and date'''
+    summary_tag = review_tag
+    if "short-summary" not in review_tag.get("class", ()):
+        summary_tag = review_tag.find("div", class_="short-summary")
+
+    title = summary_tag.find("h3", class_="short-title").string.strip()
+    date = summary_tag.find("div", class_="date").string.strip()
+    return (title, parse_timestamp(date))
+
+
+def review_summaries(html):
+    '''Summary tags of the reviews of a reviews page, the rest of the page is not built'''
+    soup = make_soup(html, parse_only=REVIEW_SUMMARY_ONLY)
+    return soup.find_all("div", class_="short-summary")
+
+
+def ends_with_known_review(review_tags, known_keys):
+    '''True if the last of review_tags, or of their summaries, has one of known_keys.
+
+    Reviews are listed newest first, so the pages after it have no new reviews.
+    '''
+    last_tag = None
+    for last_tag in review_tags:
+        pass
+    return bool(known_keys) and last_tag is not None and review_tag_key(last_tag) in known_keys
 
 
 class ReviewParser:
@@ -329,7 +393,7 @@ class ReviewParser:
 
         previous_tag = review_tag.previous_sibling.previous_sibling
         if previous_tag.__class__.__name__ is "Comment":
-            self.review["last_update"] = previous_tag.string.split('"')[1]
+            self.review["last_update"] = parse_timestamp(previous_tag.string.split('"')[1])
 
         # short summary tag
         short_summary_tag = review_tag.find("div", class_="short-summary row")
@@ -361,7 +425,7 @@ class ReviewParser:
 
         # date
         date = short_summary_tag.find("div", class_="date").string.strip()
-        self.review["date"] = date
+        self.review["date"] = parse_timestamp(date)
 
         # details review
         details_review_tag = review_tag.find("div", class_="details-review")
@@ -395,7 +459,7 @@ class ReviewParser:
         return self.review
 
     def employer_reviews_parser(self, html):
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html)
 
         # Left column
         left_column = soup.find("div", class_="col-md-8 col-left")
@@ -454,11 +518,13 @@ class JobParser:
     def fetch_and_parse(self):
         url = self.get_url()
         response = fetch_url(url)
+        self.parse(response.text, url)
 
-        if response.text.find('jobs_show') is -1:
-            raise KeyError("Job '{}' not found at {}".format(self.code, url))
+    def parse(self, html, url=None):
+        if html.find('jobs_show') is -1:
+            raise KeyError("Job '{}' not found at {}".format(self.code, url or self.get_url()))
 
-        self.job = self.parse_job_page(response.text)
+        self.job = self.parse_job_page(html)
 
     def parse_job_page(self, html):
         '''div: content
@@ -474,7 +540,7 @@ class JobParser:
         '''
         job = {"code": self.code}
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, parse_only=JOB_PAGE_ONLY)
         div_content = soup.find("div", class_="content")
 
         side_bar = soup.find("div", class_="side_bar")
@@ -484,7 +550,7 @@ class JobParser:
         job_detail = div_content.find("div", class_="job-detail")
         last_upd = div_content.contents[1].string
         _ = last_upd[last_upd.find('"') + 1:-1]
-        job["last_update"] = _[:_.rfind(' ')]
+        job["last_update"] = parse_timestamp(_[:_.rfind(' ')])
         # Header
         # - job_info
         #   - h1: job_title
@@ -534,12 +600,9 @@ class JobParser:
         return to_json(self.job)
 
     def save_json(self):
-        filename = "{}.json".format(self.job["code"])
-        filepath = os.path.join(app.config["JOBS_CACHE_DIR"], filename)
-        to_json_file(self.get_dict(), filepath)
-        file_size = os.path.getsize(filepath)
+        get_store("jobs").put(self.job["code"], self.get_dict())
         if "VERBOSE" in app.config and app.config["VERBOSE"]:
-            print("Saved file {} [{} bytes]".format(filename, file_size))
+            print("Saved job {}".format(self.job["code"]))
 
 
 class JobTagParser:
@@ -549,7 +612,7 @@ class JobTagParser:
         self.job = {}
         comment = job_tag.find_next(string=lambda text: isinstance(text, Comment))
         _last_update = comment.extract().split('"')[1]
-        self.job["last_update"] = _last_update[:_last_update.rfind(" ")]
+        self.job["last_update"] = parse_timestamp(_last_update[:_last_update.rfind(" ")])
         self.job["title"] = job_tag.find_all("a")[1].text.strip()
         self.job["employer_code"] = job_tag.find("a", {"target": "_blank"})["href"].split("/")[-1]
         _url = job_tag.find("div", class_="details").a["href"]
@@ -580,11 +643,97 @@ class JobTagParser:
         to_json_file(self.job, filename)
 
 
+def parse_job_cards(content):
+    '''List of the job dicts of a jobs_html fragment or jobs panel tag.
+
+    Walks the tree once and returns the same dicts as JobTagParser on every
+    tag of JobTagIterator: each card takes the first "Last updated" comment
+    after its start that no previous card took.
+    '''
+    root = content if isinstance(content, Tag) else make_soup(content)
+    cards = []
+    waiting = []  # cards without comment yet, oldest first
+
+    def walk(tag, card):
+        for node in tag.children:
+            if isinstance(node, Comment):
+                if waiting:
+                    waiting.pop(0).comment = node
+            elif isinstance(node, Tag):
+                classes = node.get("class", ())
+                if card is None and "job" in classes:
+                    new_card = JobCard()
+                    cards.append(new_card)
+                    waiting.append(new_card)
+                    walk(node, new_card)
+                else:
+                    if card is not None:
+                        card.read(node, classes)
+                    walk(node, card)
+
+    walk(root, None)
+    return [card.get_dict() for card in cards]
+
+
+class JobCard:
+    '''Fields of a job card, read from its tags in document order'''
+
+    # Text fields, read from the first (tag name, class) match in the card
+    TEXT_FIELDS = {
+        ("span", "salary-text"): "salary",
+        ("div", "address"): "address",
+        ("div", "tag-list"): "tags",
+        ("div", "description"): "description",
+        ("span", "distance-time"): "distance",
+    }
+
+    def __init__(self):
+        self.comment = None
+        self.links = 0
+        self.fields = {}
+
+    def __repr__(self):
+        return "<JobCard {}>".format(self.fields.get("code"))
+
+    def read(self, tag, classes):
+        fields = self.fields
+
+        if tag.name == "a":
+            self.links += 1
+            if self.links == 2:
+                fields["title"] = tag.text.strip()
+            if "employer_code" not in fields and tag.get("target") == "_blank":
+                fields["employer_code"] = tag["href"].split("/")[-1]
+            return
+
+        if tag.name == "div" and "details" in classes and "code" not in fields:
+            fields["code"] = tag.a["href"].split("/")[-1]
+
+        for class_name in classes:
+            field = self.TEXT_FIELDS.get((tag.name, class_name))
+            if field and field not in fields:
+                fields[field] = tag.text.strip()
+
+    def get_dict(self):
+        fields = self.fields
+        job = {}
+        _last_update = self.comment.split('"')[1]
+        job["last_update"] = parse_timestamp(_last_update[:_last_update.rfind(" ")])
+        job["title"] = fields["title"]
+        job["employer_code"] = fields["employer_code"]
+        job["code"] = fields["code"]
+        job["salary"] = fields["salary"]
+        job["address"] = fields["address"].split("\n\n\n")
+        job["tags"] = fields["tags"].split("\n\n\n")
+        job["description"] = fields["description"]
+        job["distance"] = fields["distance"]
+        job["last_post"] = get_post_date(job["last_update"], job["distance"])
+        return job
+
+
 def get_post_date(last_update, distance):
-    last_dt = str_to_datetime(last_update)
     delta = get_time_distance_delta(distance)
-    post_dt = last_dt - delta
-    return post_dt.strftime(app.config["DATETIME_FORMAT"])
+    return last_update - delta
 
 
 def get_time_distance_delta(time_distance):
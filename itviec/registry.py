@@ -0,0 +1,60 @@
+from sqlalchemy import event
+
+from itviec.bulk import split_address
+from itviec.db import db
+from itviec.models import Address, Tag
+
+
+class Registry():
+    '''Tag and Address instances of a session, by name and full_address.
+
+    Every row is loaded with the first lookup, missing ones are created and
+    added to the session without a query.
+    '''
+
+    def __init__(self, session):
+        self.session = session
+        self.tags = None
+        self.addresses = None
+
+    def load(self):
+        self.tags = {tag.name: tag for tag in self.session.query(Tag)}
+        self.addresses = {address.full_address: address for address in self.session.query(Address)}
+
+    def tag(self, name):
+        if self.tags is None:
+            self.load()
+
+        tag = self.tags.get(name)
+        if tag is None:
+            tag = Tag(name=name)
+            self.session.add(tag)
+            self.tags[name] = tag
+        return tag
+
+    def address(self, full_address):
+        if self.addresses is None:
+            self.load()
+
+        address = self.addresses.get(full_address)
+        if address is None:
+            city, district = split_address(full_address)
+            address = Address(full_address=full_address, city=city, district=district)
+            self.session.add(address)
+            self.addresses[full_address] = address
+        return address
+
+    def clear(self, *args):
+        '''Forget the instances, new ones are gone after a rollback'''
+        self.tags = None
+        self.addresses = None
+
+
+def get_registry():
+    '''Registry of the current session'''
+    session = db.session()
+    if "registry" not in session.info:
+        registry = Registry(session)
+        event.listen(session, "after_soft_rollback", registry.clear)
+        session.info["registry"] = registry
+    return session.info["registry"]
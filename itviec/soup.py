@@ -0,0 +1,36 @@
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+from flask import current_app as app
+
+# BeautifulSoup tree builders, fastest last
+BACKENDS = ("html.parser", "html5lib", "lxml")
+
+# Backends already reported as unavailable
+_missing = set()
+
+
+def get_backend():
+    '''HTML_PARSER backend, or html.parser if it's not installed'''
+    backend = app.config["HTML_PARSER"]
+
+    if backend not in BACKENDS:
+        raise ValueError("Unknown HTML_PARSER '{}'. Valid backends are {}.".format(backend, ", ".join(BACKENDS)))
+
+    if builder_registry.lookup(backend) is None:
+        if backend not in _missing:
+            _missing.add(backend)
+            print("HTML parser '{}' is not installed, using 'html.parser'.".format(backend))
+        return "html.parser"
+
+    return backend
+
+
+def make_soup(markup, parse_only=None):
+    '''Parse markup, building only the parse_only subtrees if HTML_PARSE_ONLY is set'''
+    backend = get_backend()
+
+    # html5lib always builds the whole tree
+    if not app.config["HTML_PARSE_ONLY"] or backend == "html5lib":
+        parse_only = None
+
+    return BeautifulSoup(markup, backend, parse_only=parse_only)
@@ -1,26 +1,34 @@
 import json
-from datetime import datetime
+import os
 
 from flask import current_app as app
 
 from itviec.feeds import JobsFeed
-from itviec.parsers import JobTagParser
+from itviec.parsers import parse_job_cards
+from itviec.encoding import dump_json, load_json
 from itviec.helpers import fetch_url, to_json_file
+from itviec.time import load_job_timestamps
 
 
-def fetch_jobs():
-    '''Download job summary list'''
-    jobs = []
+def fetch_jobs(resume=False):
+    '''Download job summary list, or with resume the rest of an interrupted download'''
     feed = JobsFeed()
-    for page in feed:
+    snapshot = FeedSnapshotWriter(app.config["JOBS_JSON_FILE"])
+    url = snapshot.open(resume)
+    if url is None:
+        pages = feed.pages()
+    else:
+        print("Resuming after {} jobs.".format(snapshot.count))
+        pages = feed.pages(url) if url else ()
+
+    for page in pages:
         print(".", end='', flush=True)
-        for job_tag in page:
-            job_parser = JobTagParser(job_tag)
-            jobs.append(job_parser.get_dict())
+        snapshot.write_page(parse_job_cards(page.content), page.next_p)
     print("")
-    to_json_file(jobs, app.config["JOBS_JSON_FILE"])
+    snapshot.close()
+
     emp_count = len(get_employers_with_jobs())
-    print("Found {} jobs from {} employers.".format(len(jobs), emp_count))
+    print("Found {} jobs from {} employers.".format(snapshot.count, emp_count))
 
 
 def fetch_employers():
@@ -31,31 +39,184 @@ def fetch_employers():
     print("Found {} employers.".format(employers_count))
 
 
-def fetch_all():
+def fetch_all(resume=False):
     fetch_employers()
-    fetch_jobs()
-
-
-def get_job_tags():
+    fetch_jobs(resume)
+
+
+class FeedSnapshotWriter:
+    '''Writes the job tags of a feed crawl to path as NDJSON, one page at a time.
+
+    Tags are appended to <path>.part. After every page the size of the part
+    file and the next page url are saved to <path>.resume, so a crawl can
+    go on from its last complete page with open(resume=True). close() moves
+    the finished snapshot to path.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.part_path = path + ".part"
+        self.resume_path = path + ".resume"
+        self.file = None
+        self.count = 0
+
+    def __repr__(self):
+        return "<FeedSnapshotWriter {} jobs:{}>".format(self.path, self.count)
+
+    def open(self, resume=False):
+        '''Next page url to fetch when resuming, "" if the crawl was complete, or None to start over'''
+        state = self.load_state() if resume else None
+        if state is None:
+            self.file = open(self.part_path, "wb")
+            return None
+
+        self.file = open(self.part_path, "r+b")
+        self.file.truncate(state["size"])
+        self.file.seek(state["size"])
+        self.count = state["count"]
+        return state["next"]
+
+    def load_state(self):
+        try:
+            with open(self.resume_path, "r") as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return None
+
+        if not os.path.isfile(self.part_path) or os.path.getsize(self.part_path) < state["size"]:
+            return None
+        return state
+
+    def write_page(self, job_tags, next_url):
+        for job_tag in job_tags:
+            self.file.write(dump_json(job_tag) + b"\n")
+            self.count += 1
+        self.file.flush()
+
+        state = {"next": next_url or "", "size": self.file.tell(), "count": self.count}
+        to_json_file(state, self.resume_path + ".tmp")
+        os.replace(self.resume_path + ".tmp", self.resume_path)
+
+    def close(self):
+        self.file.close()
+        os.replace(self.part_path, self.path)
+        os.remove(self.resume_path)
+        invalidate_feed_index()
+
+
+def write_job_tags(job_tags):
+    '''Replace the jobs feed snapshot with job_tags'''
+    snapshot = FeedSnapshotWriter(app.config["JOBS_JSON_FILE"])
+    snapshot.open()
+    snapshot.write_page(job_tags, None)
+    snapshot.close()
+
+
+def iter_job_tags(path=None):
+    '''Job tags of the feed snapshot one at a time, with their timestamps parsed.
+
+    Reads NDJSON snapshots line by line, and legacy ones holding a JSON array.
+    '''
+    path = path or app.config["JOBS_JSON_FILE"]
     try:
-        with open(app.config["JOBS_JSON_FILE"], 'r') as jobs_file:
-            jobs = json.load(jobs_file)
+        jobs_file = open(path, "rb")
     except OSError:
         print("Job list missing. Run 'flask update' first.")
         exit(1)
 
-    return jobs
+    with jobs_file:
+        if jobs_file.read(1) == b"[":
+            jobs_file.seek(0)
+            lines = load_json(jobs_file.read())
+        else:
+            jobs_file.seek(0)
+            lines = (load_json(line) for line in jobs_file if line.strip())
+
+        for job_tag in lines:
+            yield load_job_timestamps(job_tag)
+
+
+class FeedIndex:
+    '''Job tags of JOBS_JSON_FILE, with their timestamps parsed, indexed by
+    job and employer.
+
+    Built once per command by get_feed_index, and built again when the file
+    changes.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.version = self.file_version()
+
+        self.job_tags = []
+        self.jobs = {}
+        self.employer_last_post = {}
+        self.employer_jobs = {}
+        for job_tag in iter_job_tags(path):
+            self.job_tags.append(job_tag)
+            self.add(job_tag)
+
+    def __repr__(self):
+        return "<FeedIndex jobs:{} employers:{}>".format(len(self.jobs), len(self.employer_jobs))
+
+    def add(self, job_tag):
+        code = job_tag["code"]
+        employer_code = job_tag["employer_code"]
+        self.jobs[code] = job_tag
+
+        if employer_code in self.employer_jobs:
+            self.employer_jobs[employer_code].append(code)
+            if self.employer_last_post[employer_code] < job_tag["last_post"]:
+                self.employer_last_post[employer_code] = job_tag["last_post"]
+        else:
+            self.employer_jobs[employer_code] = [code]
+            self.employer_last_post[employer_code] = job_tag["last_post"]
+
+    def file_version(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def is_stale(self):
+        try:
+            return self.file_version() != self.version
+        except OSError:
+            return True
+
+
+def get_feed_index():
+    '''FeedIndex of the current app, built on first use and when JOBS_JSON_FILE changes'''
+    index = app.extensions.get("feed_index")
+    if index is None or index.path != app.config["JOBS_JSON_FILE"] or index.is_stale():
+        try:
+            index = FeedIndex(app.config["JOBS_JSON_FILE"])
+        except OSError:
+            print("Job list missing. Run 'flask update' first.")
+            exit(1)
+        app.extensions["feed_index"] = index
+    return index
+
+
+def invalidate_feed_index():
+    '''Forget the FeedIndex of the current app, after writing JOBS_JSON_FILE'''
+    app.extensions.pop("feed_index", None)
+
+
+def get_job_tags():
+    '''Job tags list of the FeedIndex, for callers reading it several times.
+
+    The list is shared with the index and must not be modified, use
+    iter_job_tags to read the snapshot once.
+    '''
+    return get_feed_index().job_tags
 
 
 def get_timed_job_tags():
-    jobs = get_job_tags()
-    for j in jobs:
-        j["last_post"] = datetime.strptime(j["last_post"], app.config["DATETIME_FORMAT"])
-    return jobs
+    '''Job tags, whose timestamps are always parsed now, streamed from the snapshot'''
+    return iter_job_tags()
 
 
 def get_job_codes():
-    return [j["code"] for j in get_job_tags()]
+    return list(get_feed_index().jobs)
 
 
 def get_employer_codes():
@@ -71,27 +232,16 @@ def get_employer_codes():
 
 
 def get_employers_with_jobs():
-    employers = {j["employer_code"]: None for j in get_job_tags()}
-    return list(employers.keys())
+    return list(get_feed_index().employer_jobs)
 
 
 def get_employers_with_feed_date():
-    employers = {}
-    for j in get_job_tags():
-        if j["employer_code"] in employers:
-            if employers[j["employer_code"]] < j["last_post"]:
-                employers[j["employer_code"]] = j["last_post"]
-        else:
-            employers[j["employer_code"]] = j["last_post"]
-    return employers
+    return dict(get_feed_index().employer_last_post)
 
 
 def get_employer_feed_date(employer_code):
-    last_post = ""
-    for j in get_job_tags():
-        if j["employer_code"] == employer_code:
-            if j["last_post"] > last_post:
-                last_post = j["last_post"]
-    if not last_post:
-        return None
-    return last_post
+    return get_feed_index().employer_last_post.get(employer_code)
+
+
+def get_employer_job_codes(employer_code):
+    return list(get_feed_index().employer_jobs.get(employer_code, ()))
@@ -1,17 +1,12 @@
-import json
-
-from flask import current_app as app
+from datetime import timedelta
 
 from itviec.db import db
 from itviec.models import Job
-from itviec.time import str_to_datetime
+from itviec.source import iter_job_tags
 
 
 def update_jobs_stats():
     '''Show jobs stats'''
-    with open(app.config["JOBS_JSON_FILE"], 'r') as jobs_file:
-        jobs = json.load(jobs_file)
-
     emps = {}
     tags = {}
     locs = {
@@ -21,12 +16,14 @@ def update_jobs_stats():
         "Others": 0,
     }
 
-    for job in jobs:
+    job_count = 0
+    for job in iter_job_tags():
+        job_count += 1
         add_job_to_employer(emps, job)
         count_job_tags(tags, job)
         count_job_locations(locs, job)
 
-    print("Found {} jobs on {} employers.".format(len(jobs), len(emps)))
+    print("Found {} jobs on {} employers.".format(job_count, len(emps)))
     print("Found {} tags.".format(len(tags)))
     for loc in locs:
         print("Found {} jobs in {}.".format(locs[loc], loc))
@@ -70,12 +67,9 @@ def emps_per_job_count(emps):
 
 
 def to_be_updated():
-    with open(app.config["JOBS_JSON_FILE"], 'r') as jobs_file:
-        jobs = json.load(jobs_file)
-
     jobs_to_update = []
     deltas = []
-    for job in jobs:
+    for job in iter_job_tags():
         has_job = db.session.query(Job).filter_by(code=job["code"]).first()
         if has_job:
             delta = get_delta(job["last_post"], has_job.last_post)
@@ -101,9 +95,7 @@ def get_employers_from_job_tags(job_tags):
 
 
 def get_delta(new, old):
-    new_dt = str_to_datetime(new)
-    old_dt = str_to_datetime(old)
-    return new_dt - old_dt
+    return new - old
 
 
 def print_delta_distribution(deltas):
@@ -111,8 +103,7 @@ def print_delta_distribution(deltas):
     for hours in range(1, 24):
         count = 0
         for d in deltas:
-            hours_in_seconds = hours * 60 * 60
-            if d > hours_in_seconds:
+            if d > timedelta(hours=hours):
                 count += 1
         percent = round(count * 100 / total_deltas, 2)
         print("{} % of deltas differ more than {} hours".format(percent, hours))
@@ -0,0 +1,314 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import date
+
+from flask import current_app as app
+
+from itviec.encoding import decode, encode, get_encoding
+from itviec.time import parse_timestamp
+
+# Cache backends, selected with CACHE_BACKEND
+BACKENDS = ("directory", "sqlite")
+
+
+class CacheMiss(KeyError):
+    pass
+
+
+class Store:
+    '''Items of one kind by code, on top of the get_data/put_data methods of a backend.
+
+    Items are written in the store's encoding and read in any encoding, see
+    itviec.encoding. Every put and delete also updates the metadata index.
+    '''
+
+    INDENT = None
+
+    def __init__(self, index, encoding="json"):
+        self.index = index
+        self.encoding = encoding
+
+    def dump(self, item):
+        return encode(item, self.encoding, self.INDENT)
+
+    def load(self, data):
+        return decode(data)
+
+    def get(self, code):
+        return self.load(self.get_data(code))
+
+    def get_many(self, codes):
+        '''{code: item} of the cached codes'''
+        return {code: self.load(data) for code, data in self.get_data_many(codes).items()}
+
+    def put(self, code, item):
+        self.put_many({code: item})
+
+    def put_many(self, items):
+        data = {code: self.dump(item) for code, item in items.items()}
+        self.put_data_many(data)
+        self.index.put_many(items, data)
+
+    def delete(self, code):
+        self.delete_many([code])
+
+    def delete_many(self, codes):
+        self.delete_data_many(codes)
+        self.index.delete_many(codes)
+
+    def entries(self):
+        '''{code: index entry} of every cached item, see CacheIndex'''
+        if self.index.memory is None:
+            self.index.sync(self)
+        return self.index.memory
+
+
+class DirectoryStore(Store):
+    '''One file per item, named after its code.
+
+    Files keep the .json extension in every encoding, so a directory can be
+    re-encoded in place and mix legacy and versioned files.
+    '''
+
+    INDENT = 2
+
+    def __init__(self, directory, index, encoding="json"):
+        super().__init__(index, encoding)
+        self.directory = directory
+
+    def __repr__(self):
+        return "<DirectoryStore {} encoding:{}>".format(self.directory, self.encoding)
+
+    def path(self, code):
+        return os.path.join(self.directory, "{}.json".format(code))
+
+    def get_data(self, code):
+        try:
+            with open(self.path(code), "rb") as json_file:
+                return json_file.read()
+        except FileNotFoundError:
+            raise CacheMiss("Not found in cache: {}".format(code))
+
+    def get_data_many(self, codes):
+        items = {}
+        for code in codes:
+            try:
+                items[code] = self.get_data(code)
+            except CacheMiss:
+                pass
+        return items
+
+    def put_data_many(self, data):
+        for code, item_data in data.items():
+            with open(self.path(code), "wb") as json_file:
+                json_file.write(item_data)
+
+    def delete_data_many(self, codes):
+        for code in codes:
+            try:
+                os.remove(self.path(code))
+            except FileNotFoundError:
+                pass
+
+    def codes(self):
+        return [filename[:-len(".json")] for filename in os.listdir(self.directory) if filename.endswith(".json")]
+
+    def __contains__(self, code):
+        return os.path.isfile(self.path(code))
+
+
+class SqliteDatabase:
+    '''Connection to a sqlite database in WAL mode, one per thread.
+
+    In WAL mode readers don't block the writer. Writers of other threads and
+    processes wait for each other up to 30 seconds.
+    '''
+
+    BATCH_SIZE = 500
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+
+    def connect(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def select_in(self, query, params, values):
+        '''Rows of query, whose last parameter is an IN () of values, BATCH_SIZE values at a time'''
+        values = list(values)
+        conn = self.connect()
+        for start in range(0, len(values), self.BATCH_SIZE):
+            batch = values[start:start + self.BATCH_SIZE]
+            for row in conn.execute(query.format(", ".join("?" * len(batch))), list(params) + batch):
+                yield row
+
+    def execute_many(self, statement, rows):
+        '''executemany in one transaction per BATCH_SIZE rows'''
+        conn = self.connect()
+        for start in range(0, len(rows), self.BATCH_SIZE):
+            with conn:
+                conn.executemany(statement, rows[start:start + self.BATCH_SIZE])
+
+
+class SqliteStore(Store):
+    '''Items of one kind in a sqlite database shared by all kinds'''
+
+    def __init__(self, path, kind, index, encoding="json"):
+        super().__init__(index, encoding)
+        self.db = SqliteDatabase(path)
+        self.kind = kind
+
+        with self.db.connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "kind TEXT NOT NULL, code TEXT NOT NULL, data BLOB NOT NULL, PRIMARY KEY (kind, code))")
+
+    def __repr__(self):
+        return "<SqliteStore {} kind:{} encoding:{}>".format(self.db.path, self.kind, self.encoding)
+
+    def get_data(self, code):
+        row = self.db.connect().execute(
+            "SELECT data FROM cache WHERE kind = ? AND code = ?", (self.kind, code)).fetchone()
+        if row is None:
+            raise CacheMiss("Not found in cache: {}".format(code))
+        return row[0]
+
+    def get_data_many(self, codes):
+        query = "SELECT code, data FROM cache WHERE kind = ? AND code IN ({})"
+        return dict(self.db.select_in(query, (self.kind,), codes))
+
+    def put_data_many(self, data):
+        rows = [(self.kind, code, item_data) for code, item_data in data.items()]
+        self.db.execute_many("INSERT OR REPLACE INTO cache (kind, code, data) VALUES (?, ?, ?)", rows)
+
+    def delete_data_many(self, codes):
+        rows = [(self.kind, code) for code in codes]
+        self.db.execute_many("DELETE FROM cache WHERE kind = ? AND code = ?", rows)
+
+    def codes(self):
+        rows = self.db.connect().execute("SELECT code FROM cache WHERE kind = ?", (self.kind,))
+        return [row[0] for row in rows]
+
+    def __contains__(self, code):
+        row = self.db.connect().execute(
+            "SELECT 1 FROM cache WHERE kind = ? AND code = ?", (self.kind, code)).fetchone()
+        return row is not None
+
+
+class CacheIndex:
+    '''Metadata of the cached items of one kind, kept next to the cache in CACHE_DB_FILE.
+
+    An entry is a dict of the last_post and last_update of the item, and
+    the size and sha1 of its stored data, so freshness checks don't load the
+    items. Entries are loaded once into memory and kept up to date by the
+    store. Items missing from the index, like caches made before the index
+    existed, are indexed on load. rebuild() indexes every item again.
+    '''
+
+    def __init__(self, path, kind):
+        self.db = SqliteDatabase(path)
+        self.kind = kind
+        self.memory = None
+
+        with self.db.connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_index ("
+                "kind TEXT NOT NULL, code TEXT NOT NULL, last_post TEXT, last_update TEXT, "
+                "size INTEGER NOT NULL, hash TEXT NOT NULL, PRIMARY KEY (kind, code))")
+
+    def __repr__(self):
+        return "<CacheIndex {} kind:{}>".format(self.db.path, self.kind)
+
+    def load(self):
+        rows = self.db.connect().execute(
+            "SELECT code, last_post, last_update, size, hash FROM cache_index WHERE kind = ?", (self.kind,))
+        self.memory = {row[0]: make_entry(*row[1:]) for row in rows}
+        return self.memory
+
+    def put_many(self, items, data):
+        rows = []
+        for code, item in items.items():
+            item_data = data[code]
+            rows.append((self.kind, code, _timestamp_str(item.get("last_post")),
+                         _timestamp_str(item.get("last_update")), len(item_data), hashlib.sha1(item_data).hexdigest()))
+
+        self.db.execute_many(
+            "INSERT OR REPLACE INTO cache_index (kind, code, last_post, last_update, size, hash) "
+            "VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+        if self.memory is not None:
+            for row in rows:
+                self.memory[row[1]] = make_entry(*row[2:])
+
+    def delete_many(self, codes):
+        rows = [(self.kind, code) for code in codes]
+        self.db.execute_many("DELETE FROM cache_index WHERE kind = ? AND code = ?", rows)
+        if self.memory is not None:
+            for code in codes:
+                self.memory.pop(code, None)
+
+    def sync(self, store):
+        '''Load the index, indexing the items of store missing from it and dropping deleted ones'''
+        entries = self.load()
+        codes = set(store.codes())
+
+        self.delete_many(list(set(entries) - codes))
+
+        missing = sorted(codes - set(entries))
+        for start in range(0, len(missing), SqliteDatabase.BATCH_SIZE):
+            data = store.get_data_many(missing[start:start + SqliteDatabase.BATCH_SIZE])
+            self.put_many({code: store.load(item_data) for code, item_data in data.items()}, data)
+
+        return self.memory
+
+    def rebuild(self, store):
+        with self.db.connect() as conn:
+            conn.execute("DELETE FROM cache_index WHERE kind = ?", (self.kind,))
+        return self.sync(store)
+
+
+def make_entry(last_post, last_update, size, content_hash):
+    return {
+        "last_post": parse_timestamp(last_post),
+        "last_update": parse_timestamp(last_update),
+        "size": size,
+        "hash": content_hash,
+    }
+
+
+def _timestamp_str(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def make_store(kind, backend=None):
+    '''Store of the "jobs" or "employers" cache with the given or CACHE_BACKEND backend'''
+    backend = backend or app.config["CACHE_BACKEND"]
+
+    index = CacheIndex(app.config["CACHE_DB_FILE"], kind)
+    encoding = get_encoding(app.config["CACHE_ENCODING"])
+
+    if backend == "directory":
+        setting = "JOBS_CACHE_DIR" if kind == "jobs" else "EMPLOYERS_CACHE_DIR"
+        return DirectoryStore(app.config[setting], index, encoding)
+    if backend == "sqlite":
+        return SqliteStore(app.config["CACHE_DB_FILE"], kind, index, encoding)
+
+    raise ValueError("Unknown CACHE_BACKEND '{}'. Valid backends are {}.".format(backend, ", ".join(BACKENDS)))
+
+
+def get_store(kind):
+    '''Store of the "jobs" or "employers" cache of the current app, created on first use'''
+    stores = app.extensions.setdefault("cache_stores", {})
+    if kind not in stores:
+        stores[kind] = make_store(kind)
+    return stores[kind]
@@ -1,14 +1,53 @@
 from datetime import datetime
 
-from flask import current_app as app
 
+# Review dates are shown as month and year, like "January 2020"
+REVIEW_DATE_FORMAT = "%B %Y"
 
-def str_to_datetime(date_string):
-    return datetime.strptime(date_string, app.config["DATETIME_FORMAT"])
 
+def parse_timestamp(value):
+    '''datetime of a timestamp from the site or from a cache file.
 
-def datetime_to_str(datetime_type):
-    return datetime_type.strftime(app.config["DATETIME_FORMAT"])
+    Accepts ISO 8601, as written to cache files, the "2020-01-10 10:15:00 +0700"
+    comments of the site and review dates. Time zone offsets are dropped, as
+    every timestamp is in site local time.
+    '''
+    if value is None or isinstance(value, datetime):
+        return value
+
+    try:
+        timestamp = datetime.fromisoformat(value)
+    except ValueError:
+        parts = value.split(" ")
+        if len(parts) == 3:
+            timestamp = datetime.fromisoformat(" ".join(parts[:2]))
+        else:
+            timestamp = datetime.strptime(value, REVIEW_DATE_FORMAT)
+
+    return timestamp.replace(tzinfo=None)
+
+
+def load_job_timestamps(job):
+    '''Parse the timestamps of a job or job tag dict loaded from JSON'''
+    job["last_update"] = parse_timestamp(job["last_update"])
+    job["last_post"] = parse_timestamp(job["last_post"])
+    return job
+
+
+def load_employer_timestamps(employer):
+    '''Parse the timestamps of an employer dict loaded from JSON'''
+    employer["last_update"] = parse_timestamp(employer["last_update"])
+    employer["last_post"] = parse_timestamp(employer["last_post"])
+
+    for job_tag in employer.get("jobs", ()):
+        load_job_timestamps(job_tag)
+
+    for review in employer.get("reviews", ()):
+        review["date"] = parse_timestamp(review["date"])
+        if "last_update" in review:
+            review["last_update"] = parse_timestamp(review["last_update"])
+
+    return employer
 
 
 def time_since(datetime_type):
@@ -1,15 +1,13 @@
-from sqlalchemy.exc import IntegrityError
-
 import itviec.cache
 from itviec.composers import compose_job
 from itviec.db import db
-from itviec.models import Job, Employer, Address, Tag
+from itviec.models import Job, Employer
 from itviec.helpers import to_json
-
-from pprint import pprint
+from itviec.registry import get_registry
 
 
 def update_employer(employer_code):
+    '''Stage the changes of a cached employer, the caller commits them'''
     employer_dict = itviec.cache.get_employer(employer_code)
 
     query = db.session.query(Employer).filter_by(code=employer_code)
@@ -22,8 +20,6 @@ def update_employer(employer_code):
     update_employer_tags(employer, employer_dict)
     employer_dict["why"] = to_json(employer_dict["why"], indent=None)
 
-    db.session.commit()
-
     del employer_dict["addresses"]
     del employer_dict["reviews"]
     del employer_dict["tags"]
@@ -31,7 +27,6 @@ def update_employer(employer_code):
 
     query = db.session.query(Employer).filter(Employer.code == employer_dict["code"])
     query.update(employer_dict)
-    db.session.commit()
 
 
 def update_employer_jobs(employer, employer_dict):
@@ -53,7 +48,9 @@ def update_employer_jobs(employer, employer_dict):
     for job in employer.jobs:
         if job.code not in job_codes:
             print("Purging deprecated job {}".format(job.code))
-            db.session.query(Job).filter_by(code=job.code).delete()
+            # The session deletes its tag and address links too, their
+            # rows would clash with a new job reusing the id
+            db.session.delete(job)
 
 
 def update_job(job):
@@ -69,17 +66,13 @@ def update_job(job):
         del job_d["distance"]
 
     db.session.query(Job).filter(Job.code == job_d["code"]).update(job_d)
-    db.session.commit()
 
 
 def update_employer_tags(employer, employer_dict):
     # add new tags
+    registry = get_registry()
     for tag_name in employer_dict["tags"]:
-        tag = db.session.query(Tag).filter_by(name=tag_name).first()
-        if tag is None:
-            tag = Tag(name=tag_name)
-            db.session.add(tag)
-            db.session.commit()
+        tag = registry.tag(tag_name)
 
         # check if the tag is linked
         if tag not in employer.tags:
@@ -93,21 +86,11 @@ def update_employer_tags(employer, employer_dict):
 
 def update_employer_addresses(employer, employer_dict):
     # add new addresses
+    registry = get_registry()
     for addr in employer_dict["addresses"]:
-        address = db.session.query(Address).filter_by(full_address=addr).first()
-        if address is None:
-            print("Could not find Address: {}".format(addr))
-            print("db.session.dirty")
-            pprint(db.session.dirty)
-
-            address = Address(full_address=addr)
-
-            try:
-                db.session.commit()
-            except IntegrityError:
-                print("FAILURE!! db.session.dirty")
-                pprint(db.session.dirty)
-                # raise
+        if addr == '':
+            continue
+        address = registry.address(addr)
 
         # check if the address is linked
         if address not in employer.addresses:
@@ -117,17 +100,13 @@ def update_employer_addresses(employer, employer_dict):
     for address in employer.addresses:
         if address.full_address not in employer_dict["addresses"]:
             del address
-            db.session.commit()
 
 
 def update_job_tags(job, job_dict):
     # add new tags
+    registry = get_registry()
     for tag_name in job_dict["tags"]:
-        tag = db.session.query(Tag).filter_by(name=tag_name).first()
-        if tag is None:
-            tag = Tag(name=tag_name)
-            db.session.add(tag)
-            db.session.commit()
+        tag = registry.tag(tag_name)
 
         # check if the tag is linked
         if tag not in job.tags:
@@ -141,12 +120,11 @@ def update_job_tags(job, job_dict):
 
 def update_job_addresses(job, job_dict):
     # add new addresses
+    registry = get_registry()
     for addr in job_dict["addresses"]:
-        address = db.session.query(Address).filter_by(full_address=addr).first()
-        if address is None:
-            address = Address(full_address=addr)
-            db.session.add(address)
-            db.session.commit()
+        if addr == '':
+            continue
+        address = registry.address(addr)
 
         # check if the address is linked
         if address not in job.addresses:
@@ -1,46 +1,103 @@
-import time
 from datetime import timedelta
 
 from flask import current_app as app
 
 import itviec.source
-from itviec.db import db
+from itviec.db import UnitOfWork, db
 from itviec.models import Employer, Job
-from itviec.time import str_to_datetime
 from itviec.composers import install_employer
+from itviec.workers import run_pipeline, run_in_processes
 
 from itviec.update import update_employer
 
 
-def download():
+def download(confirm=True):
     feed_jobs = itviec.source.get_job_tags()
     downloads = calculate_downloads(feed_jobs)
 
-    input("Press any key to continue...")
+    if confirm:
+        input("Press any key to continue...")
 
+    print("Using {} workers, limited to {} requests/s, {} parser processes.".format(
+        app.config["DOWNLOAD_WORKERS"], app.config["DOWNLOAD_RATE"] or "unlimited",
+        app.config["PARSE_WORKERS"]))
     download_jobs(downloads["jobs"])
     download_employers(downloads["employers"])
 
 
-def upgrade():
+def upgrade(confirm=True):
     feed_jobs = itviec.source.get_job_tags()
     upd = calculate_updates(feed_jobs)
 
     if not (upd["employers"]["update"] or upd["employers"]["create"] or
             upd["jobs"]["update"] or upd["jobs"]["create"]):
+        collect_garbage()
         exit()
 
-    input("Press any key to continue...")
+    if confirm:
+        input("Press any key to continue...")
 
     for employer_code in upd["employers"]["create"]:
         print("Creating new employer {}...".format(employer_code))
         install_employer(employer_code)
 
-    for employer_code in upd["employers"]["update"]:
-        print("Updating employer {}".format(employer_code))
-        update_employer(employer_code)
+    update_employers(upd["employers"]["update"])
 
     calculate_updates(feed_jobs)
+    collect_garbage()
+
+
+def update_employers(employer_codes, commit_every=None):
+    '''Update employers, committing every commit_every of them, UPGRADE_COMMIT_EVERY by default'''
+    if commit_every is None:
+        commit_every = app.config["UPGRADE_COMMIT_EVERY"]
+
+    with UnitOfWork(db.session, commit_every) as uow:
+        for employer_code in employer_codes:
+            print("Updating employer {}".format(employer_code))
+            update_employer(employer_code)
+            uow.step()
+
+    return uow
+
+
+def collect_garbage():
+    if app.config["CACHE_GC_AFTER_UPGRADE"]:
+        itviec.cache.collect_garbage()
+
+
+def reparse(workers=None):
+    '''Rebuild job list and job/employer cache from archived pages, offline'''
+    itviec.source.fetch_jobs()
+
+    job_codes = itviec.source.get_job_codes()
+    results = run_in_processes(reparse_job, job_codes, "jobs", workers, verb="Reparsed", HTTP_OFFLINE=True)
+    missing_jobs = [code for code in results if not results[code]]
+
+    employer_codes = itviec.source.get_employers_with_jobs()
+    results = run_in_processes(reparse_employer, employer_codes, "employers", workers, verb="Reparsed",
+                               HTTP_OFFLINE=True, REVIEWS_INCREMENTAL=False)
+    missing_employers = [code for code in results if not results[code]]
+
+    print("Missing from archive: jobs: {} employers: {}".format(len(missing_jobs), len(missing_employers)))
+
+
+def reparse_job(job_code):
+    try:
+        itviec.cache.fetch_job(job_code)
+    except KeyError as e:
+        print(e)
+        return False
+    return True
+
+
+def reparse_employer(employer_code):
+    try:
+        itviec.cache.fetch_employer(employer_code)
+    except KeyError as e:
+        print(e)
+        return False
+    return True
 
 
 def calculate_downloads(feed_jobs):
@@ -71,31 +128,27 @@ def calculate_employer_downloads(feed_jobs):
         employer_code = job["employer_code"]
         if employer_code in employers:
             continue
-        valid_cache = itviec.cache.is_employer_cache_hit(employer_code, job["last_post"])
+        valid_cache = itviec.cache.is_employer_cache_hit(employer_code)
         if not valid_cache:
             employers[employer_code] = None
     return list(employers)
 
 
 def download_jobs(job_tags):
-    j_count = 0
-    j_total = len(job_tags)
-    for job in job_tags:
-        j_count += 1
-        print("Downloading job {}/{} {}...".format(j_count, j_total, job["code"]))
-        itviec.cache.fetch_job(job["code"])
-        time.sleep(0.7)
+    '''Input: job_tag list
+
+    Jobs are fetched concurrently, throttled by the client rate limiter,
+    and parsed in a pool of processes.
+    '''
+    job_codes = [job["code"] for job in job_tags]
+    run_pipeline(itviec.cache.fetch_job_html, itviec.cache.parse_job_html, itviec.cache.save_job,
+                 job_codes, "jobs")
 
 
 def download_employers(employers):
     '''Input: employer_code list'''
-    e_count = 0
-    e_total = len(employers)
-    for employer_code in employers:
-        e_count += 1
-        print("Downloading employer {}/{} {}...".format(e_count, e_total, employer_code))
-        itviec.cache.fetch_employer(employer_code)
-        time.sleep(0.7)
+    run_pipeline(itviec.cache.fetch_employer_html, itviec.cache.parse_employer_html, itviec.cache.save_employer,
+                 employers, "employers")
 
 
 def calculate_updates(feed_jobs):
@@ -125,31 +178,37 @@ def _print_report_message(employers, jobs):
 
 
 def _add_employers_from_jobs(employers, jobs):
+    db_codes = set(code for code, in db.session.query(Employer.code))
+
+    # dicts as ordered sets
+    create = dict.fromkeys(employers["create"])
+    update = dict.fromkeys(employers["update"])
+
     for job_tag in jobs["create"]:
-        db_emp = db.session.query(Employer).filter_by(code=job_tag["employer_code"]).first()
-        if db_emp:
-            if job_tag["employer_code"] not in employers["update"]:
-                employers["update"].append(job_tag["employer_code"])
+        if job_tag["employer_code"] in db_codes:
+            update.setdefault(job_tag["employer_code"])
         else:
-            if job_tag["employer_code"] not in employers["create"]:
-                employers["create"].append(job_tag["employer_code"])
+            create.setdefault(job_tag["employer_code"])
 
     for job_tag in jobs["update"]:
-        if job_tag["employer_code"] not in employers["update"]:
-            employers["update"].append(job_tag["employer_code"])
+        update.setdefault(job_tag["employer_code"])
+
+    employers["create"] = list(create)
+    employers["update"] = list(update)
 
 
 def calculate_job_upgrades(feed_jobs):
-    jobs = {"create": [], "update": []}
+    '''Jobs of the feed to create and update, and codes of the database jobs missing from the feed'''
+    jobs = {"create": [], "update": [], "delete": []}
     up_to_date_counter = 0
 
-    for job in feed_jobs:
-        has_job = Job.query.filter(Job.code == job["code"]).first()
+    db_dates = dict(db.session.query(Job.code, Job.last_post))
+    threshold = timedelta(days=1)
 
-        if has_job:
-            threshold = timedelta(days=1)
-            db_date = str_to_datetime(has_job.last_post).date()
-            feed_date = str_to_datetime(job["last_post"]).date()
+    for job in feed_jobs:
+        if job["code"] in db_dates:
+            db_date = db_dates[job["code"]].date()
+            feed_date = job["last_post"].date()
             delta = feed_date - db_date
             updated_db = delta <= threshold
 
@@ -162,33 +221,30 @@ def calculate_job_upgrades(feed_jobs):
             print("Job '{}' not found in database, needs to be created.".format(job["code"]))
             jobs["create"].append(job)
 
+    feed_codes = set(job["code"] for job in feed_jobs)
+    jobs["delete"] = [code for code in db_dates if code not in feed_codes]
+
     if "VERBOSE" in app.config and app.config["VERBOSE"]:
-        print("Jobs upgrades: update: {}, create: {}".format(
-            len(jobs["update"]), len(jobs["create"])))
+        print("Jobs upgrades: update: {}, create: {}, missing from feed: {}".format(
+            len(jobs["update"]), len(jobs["create"]), len(jobs["delete"])))
 
     return jobs
 
 
 def calculate_employer_upgrades(feed_jobs):
-    employers = {"create": [], "update": []}
+    '''Employers of the feed to create and update, and codes of the database employers without feed jobs'''
+    employers = {"create": [], "update": [], "delete": []}
     already_up_to_date = 0
 
     emp_dates = itviec.source.get_employers_with_feed_date()
-    done = []
-
-    for job in feed_jobs:
-        employer_code = job["employer_code"]
-        if employer_code in done:
-            continue
-        done.append(employer_code)
-
-        query = db.session.query(Employer).filter_by(code=employer_code)
-        has_emp = query.first()
-
-        if has_emp:
-            threshold = timedelta(days=1)
-            db_date = str_to_datetime(has_emp.last_post).date()
-            feed_date = str_to_datetime(emp_dates[employer_code]).date()
+    db_dates = dict(db.session.query(Employer.code, Employer.last_post))
+    threshold = timedelta(days=1)
+
+    feed_codes = dict.fromkeys(job["employer_code"] for job in feed_jobs)
+    for employer_code in feed_codes:
+        if employer_code in db_dates:
+            db_date = db_dates[employer_code].date()
+            feed_date = emp_dates[employer_code].date()
             delta = feed_date - db_date
             updated_db = delta <= threshold
 
@@ -202,8 +258,10 @@ def calculate_employer_upgrades(feed_jobs):
         else:
             employers["create"].append(employer_code)
 
+    employers["delete"] = [code for code in db_dates if code not in feed_codes]
+
     if "VERBOSE" in app.config and app.config["VERBOSE"]:
-        print("Employer upgrades: update: {}, create: {}".format(
-            len(employers["update"]), len(employers["create"])))
+        print("Employer upgrades: update: {}, create: {}, without feed jobs: {}".format(
+            len(employers["update"]), len(employers["create"]), len(employers["delete"])))
 
     return employers
@@ -27,25 +27,25 @@ def job(j_id):
 
 @bp.route("/jobs/hcm")
 def hcm_jobs():
-    hcm_jobs = Job.query.filter(Job.address.any(name="Ho Chi Minh"))
+    hcm_jobs = Job.query.filter(Job.addresses.any(city="Ho Chi Minh"))
     return render_template("jobs.html", jobs=hcm_jobs)
 
 
 @bp.route("/jobs/hanoi")
 def hanoi_jobs():
-    hanoi_jobs = Job.query.filter(Job.address.any(name="Ha Noi"))
+    hanoi_jobs = Job.query.filter(Job.addresses.any(city="Ha Noi"))
     return render_template("jobs.html", jobs=hanoi_jobs)
 
 
 @bp.route("/jobs/danang")
 def danang_jobs():
-    danang_jobs = Job.query.filter(Job.address.any(name="Da Nang"))
+    danang_jobs = Job.query.filter(Job.addresses.any(city="Da Nang"))
     return render_template("jobs.html", jobs=danang_jobs)
 
 
 @bp.route("/jobs/other")
 def other_jobs():
-    jobs_union = Job.query.filter(Job.address.any(Address.name.in_(("Ho Chi Minh", "Ha Noi", "Da Nang"))))
+    jobs_union = Job.query.filter(Job.addresses.any(Address.city.in_(("Ho Chi Minh", "Ha Noi", "Da Nang"))))
     other_jobs = Job.query.except_(jobs_union)
     return render_template("jobs.html", jobs=other_jobs)
 
@@ -57,7 +57,7 @@ def tags():
 
     result = []
     for tag in tags:
-        count = len(tag.jobs.all())
+        count = tag.jobs.count()
         if not count:
             continue
         perc = (count / jobs_count) * 100
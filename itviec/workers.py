@@ -0,0 +1,190 @@
+import itertools
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+
+from flask import current_app as app
+
+# Worker processes are spawned, download threads may be running when a
+# pool starts and forking them is unsafe
+MP_CONTEXT = multiprocessing.get_context("spawn")
+
+# App context of the current worker process
+_worker_context = None
+
+
+class Progress:
+    '''Prints a progress line with throughput and ETA for every finished item'''
+
+    def __init__(self, label, total, verb="Downloaded"):
+        self.label = label
+        self.total = total
+        self.verb = verb
+        self.count = 0
+        self.start = time.monotonic()
+
+    def __repr__(self):
+        return "<Progress {} {}/{}>".format(self.label, self.count, self.total)
+
+    def rate(self):
+        elapsed = time.monotonic() - self.start
+        return self.count / elapsed if elapsed else 0.0
+
+    def eta(self):
+        rate = self.rate()
+        if not rate:
+            return "--:--"
+        seconds = int((self.total - self.count) / rate)
+        return "{}:{:02d}".format(seconds // 60, seconds % 60)
+
+    def step(self, name):
+        self.count += 1
+        print("{} {} {}/{} {} [{:.2f}/s ETA {}]".format(
+            self.verb, self.label, self.count, self.total, name, self.rate(), self.eta()))
+
+    def done(self):
+        elapsed = time.monotonic() - self.start
+        print("{} {} {} in {:.1f}s ({:.2f}/s).".format(
+            self.verb, self.count, self.label, elapsed, self.rate()))
+
+
+def run_concurrently(func, items, label, workers=None, name=str):
+    '''Call func(item) for every item using a bounded pool of threads.
+
+    Every thread runs inside the current app context. The first failure
+    cancels pending items and is raised again in the calling thread.
+    '''
+    if not items:
+        return
+
+    flask_app = app._get_current_object()
+    workers = workers or app.config["DOWNLOAD_WORKERS"]
+    progress = Progress(label, len(items))
+
+    def task(item):
+        with flask_app.app_context():
+            return func(item)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(task, item): item for item in items}
+        try:
+            for future in as_completed(futures):
+                future.result()
+                progress.step(name(futures[future]))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    progress.done()
+
+
+def init_worker(settings):
+    '''Create an app with the parent's settings and keep its context pushed'''
+    global _worker_context
+    from itviec import create_app
+
+    _worker_context = create_app(test_config=settings).app_context()
+    _worker_context.push()
+
+
+def worker_settings(**overrides):
+    '''Settings of the current app to recreate it in a worker process'''
+    settings = dict(app.config)
+    settings.update(overrides)
+    return settings
+
+
+def run_in_processes(func, items, label, workers=None, verb="Processed", name=str, **overrides):
+    '''Call func(item) for every item in a pool of worker processes.
+
+    func must be a module level function. Every worker runs an app built with
+    the current settings updated with overrides. Returns {item: result}.
+    '''
+    results = {}
+    if not items:
+        return results
+
+    progress = Progress(label, len(items), verb=verb)
+    initargs = (worker_settings(**overrides),)
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=MP_CONTEXT,
+                             initializer=init_worker, initargs=initargs) as executor:
+        futures = {executor.submit(func, item): item for item in items}
+        try:
+            for future in as_completed(futures):
+                item = futures[future]
+                results[item] = future.result()
+                progress.step(name(item))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    progress.done()
+    return results
+
+
+def run_pipeline(fetch, parse, save, items, label, workers=None, parse_workers=None, name=str):
+    '''Fetch items in a pool of threads and parse them in a pool of processes.
+
+    fetch(item) runs in a download thread and returns the raw pages,
+    parse(item, pages) is a module level function run in a worker process
+    that returns plain data, and save(item, data) runs in the calling thread.
+    Pages fetched but not yet parsed are bounded by CRAWL_QUEUE_SIZE.
+
+    With parse_workers (default PARSE_WORKERS) 0, or fewer items than
+    PARSE_POOL_MIN_ITEMS, pages are parsed in the download threads instead.
+    '''
+    if not items:
+        return
+
+    workers = workers or app.config["DOWNLOAD_WORKERS"]
+    if parse_workers is None:
+        parse_workers = app.config["PARSE_WORKERS"]
+
+    if parse_workers == 0 or len(items) < app.config["PARSE_POOL_MIN_ITEMS"]:
+        def fetch_and_parse(item):
+            save(item, parse(item, fetch(item)))
+        return run_concurrently(fetch_and_parse, items, label, workers, name)
+
+    flask_app = app._get_current_object()
+    progress = Progress(label, len(items))
+    pending = iter(items)
+    max_in_flight = workers + app.config["CRAWL_QUEUE_SIZE"]
+
+    def task(item):
+        with flask_app.app_context():
+            return fetch(item)
+
+    initargs = (worker_settings(),)
+
+    with ThreadPoolExecutor(max_workers=workers) as fetchers, \
+            ProcessPoolExecutor(max_workers=parse_workers, mp_context=MP_CONTEXT,
+                                initializer=init_worker, initargs=initargs) as parsers:
+        fetching = {}
+        parsing = {}
+
+        def submit_fetches():
+            for item in itertools.islice(pending, max_in_flight - len(fetching) - len(parsing)):
+                fetching[fetchers.submit(task, item)] = item
+
+        try:
+            submit_fetches()
+            while fetching or parsing:
+                done, _ = wait(list(fetching) + list(parsing), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetching:
+                        item = fetching.pop(future)
+                        parsing[parsers.submit(parse, item, future.result())] = item
+                    else:
+                        item = parsing.pop(future)
+                        save(item, future.result())
+                        progress.step(name(item))
+                submit_fetches()
+        except BaseException:
+            for future in list(fetching) + list(parsing):
+                future.cancel()
+            raise
+
+    progress.done()
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from itviec import create_app
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+CONTENT_TYPES = {
+    ".json": "application/json; charset=utf-8",
+    ".html": "text/html; charset=utf-8",
+}
+
+# Feed pagination, as in the show_more_html of the recorded feed pages
+FEED_PAGINATION = '<div class="search-page__jobs-pagination">{}</div>'
+NEXT_FEED_LINK = '<a class="more-jobs-link" rel="next" href="{{base_url}}{}">Show more jobs</a>'
+NEXT_FEED_PAGE = re.compile(r'rel="next" href="\{base_url\}([^"]+)"')
+
+
+def read_fixture(filename):
+    with open(os.path.join(FIXTURES_DIR, filename), "r") as fixture_file:
+        return fixture_file.read()
+
+
+def load_routes(fixtures_dir=FIXTURES_DIR):
+    '''Map of request path (with query) to recorded page body'''
+    with open(os.path.join(fixtures_dir, "routes.json"), "r") as routes_file:
+        routes = json.load(routes_file)
+
+    pages = {}
+    for path, filename in routes.items():
+        with open(os.path.join(fixtures_dir, filename), "r") as page_file:
+            pages[path] = (page_file.read(), CONTENT_TYPES[os.path.splitext(filename)[1]])
+    return pages
+
+
+def replicate_routes(copies, pages=None):
+    '''Recorded site repeated copies times with renamed employers and jobs.
+
+    Copy i appends "-i" to employer codes and " i" to employer names, which
+    also renames their job codes, and chains its feed pages after the ones
+    of copy i - 1, so the feed lists copies times the recorded jobs.
+    '''
+    pages = load_routes() if pages is None else pages
+    employers = json.loads(pages["/api/v1/employers.json"][0])
+
+    feed_paths = ["/it-jobs"]
+    while True:
+        next_link = NEXT_FEED_PAGE.search(json.loads(pages[feed_paths[-1]][0])["show_more_html"])
+        if next_link is None:
+            break
+        feed_paths.append(next_link.group(1))
+
+    def feed_path(copy, page):
+        number = copy * len(feed_paths) + page
+        return "/it-jobs?page={}".format(number + 1) if number else "/it-jobs"
+
+    routes = {}
+    all_employers = []
+    for copy in range(copies):
+        def rename(text):
+            for code, name, _ in employers:
+                text = text.replace(code, "{}-{}".format(code, copy)).replace(name, "{} {}".format(name, copy))
+            return text
+
+        all_employers.extend([rename(field) for field in employer] for employer in employers)
+
+        for path, (body, content_type) in pages.items():
+            if path.startswith("/it-jobs/") or path.startswith("/companies/"):
+                routes[rename(path)] = (rename(body), content_type)
+
+        for page, path in enumerate(feed_paths):
+            feed = json.loads(rename(pages[path][0]))
+            if copy == copies - 1 and page == len(feed_paths) - 1:
+                feed["show_more_html"] = FEED_PAGINATION.format("")
+            else:
+                feed["show_more_html"] = FEED_PAGINATION.format(NEXT_FEED_LINK.format(feed_path(copy, page + 1)))
+            routes[feed_path(copy, page)] = (json.dumps(feed), pages[path][1])
+
+    routes["/api/v1/employers.json"] = (json.dumps(all_employers), pages["/api/v1/employers.json"][1])
+    return routes
+
+
+def cache_config(cache_dir):
+    '''Config overrides keeping every cache file inside cache_dir'''
+    jobs_dir = os.path.join(cache_dir, "jobs")
+    employers_dir = os.path.join(cache_dir, "employers")
+    os.mkdir(jobs_dir)
+    os.mkdir(employers_dir)
+    return {
+        "CACHE_DIR": cache_dir,
+        "JOBS_CACHE_DIR": jobs_dir,
+        "EMPLOYERS_CACHE_DIR": employers_dir,
+        "CACHE_DB_FILE": os.path.join(cache_dir, "cache.sqlite"),
+        "HTTP_CACHE_DIR": os.path.join(cache_dir, "http"),
+        "ARCHIVE_DIR": os.path.join(cache_dir, "archive"),
+        "JOBS_JSON_FILE": os.path.join(cache_dir, "jobs.json"),
+        "EMPLOYERS_JSON_FILE": os.path.join(cache_dir, "employers.json"),
+        "DOWNLOAD_RATE": 0,
+        "SQLALCHEMY_ECHO": False,
+        "DEBUG": False,
+        "VERBOSE": False,
+    }
+
+
+class StandInServer:
+    '''Local HTTP stand-in for itviec.com replaying recorded pages.
+
+    Pages may reference the server address with the '{base_url}' placeholder.
+    Responses carry an ETag and honour If-None-Match with 304 Not Modified.
+
+    server = StandInServer()
+    server.start()
+    app = create_app(profile="testing", test_config=server.config())
+    ...
+    server.stop()
+    '''
+
+    def __init__(self, pages=None, latency=0.0):
+        self.pages = load_routes() if pages is None else pages
+        self.latency = latency
+        self.requests = []
+        # {path: count} of 503 responses sent before the page
+        self.failures = {}
+        self.httpd = None
+        self.thread = None
+
+    def __repr__(self):
+        return "<StandInServer {} pages:{}>".format(self.base_url, len(self.pages))
+
+    @property
+    def base_url(self):
+        if self.httpd is None:
+            return None
+        return "http://{}:{}".format(*self.httpd.server_address[:2])
+
+    def config(self):
+        '''Config overrides pointing the app to this server'''
+        return {
+            "BASE_URL": self.base_url,
+            "JOBS_URL": self.base_url + "/it-jobs",
+            "EMPLOYERS_JSON_URL": self.base_url + "/api/v1/employers.json",
+            "TEMPLATE_EMPLOYER_URL": self.base_url + "/companies/{}",
+            "TEMPLATE_EMPLOYER_REVIEW_URL": self.base_url + "/companies/{}/review",
+        }
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.requests.append(self.path)
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if self.path not in server.pages:
+                    self.send_error(404)
+                    return
+
+                if server.failures.get(self.path):
+                    server.failures[self.path] -= 1
+                    self.send_error(503)
+                    return
+
+                body, content_type = server.pages[self.path]
+                body = body.replace("{base_url}", server.base_url).encode("utf8")
+                etag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StandInTestCase(unittest.TestCase):
+    '''Test case with a StandInServer and an app caching in a temporary directory.
+
+    Subclasses add settings of their app in app_config.
+    '''
+    app_config = {}
+
+    def setUp(self):
+        self.server = StandInServer().start()
+        self.cache_dir = tempfile.TemporaryDirectory()
+
+        test_config = self.server.config()
+        test_config.update(cache_config(self.cache_dir.name))
+        test_config.update(self.app_config)
+        self.app = create_app(profile="testing", test_config=test_config)
+
+    def tearDown(self):
+        self.server.stop()
+        self.cache_dir.cleanup()
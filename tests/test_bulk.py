@@ -0,0 +1,70 @@
+import unittest
+from unittest import mock
+
+from tests.standin import StandInTestCase
+
+
+class BulkLoadTestCase(StandInTestCase):
+
+    def count_rows(self):
+        from itviec.db import db
+        from itviec.models import Address, Employer, Job, Review, Tag
+        from itviec.models import employer_address, employer_tag, job_address, job_tag
+
+        counts = {}
+        for model in (Address, Employer, Job, Review, Tag):
+            counts[model.__tablename__] = db.session.query(model).count()
+        for table in (employer_address, employer_tag, job_address, job_tag):
+            counts[table.name] = db.session.execute(table.count()).scalar()
+        return counts
+
+    def test_load_employers(self):
+        import itviec.cache
+        import itviec.source
+        from itviec.bulk import load_employers
+        from itviec.models import Employer, Job
+        from itviec.upgrade import download_employers
+
+        with self.app.app_context():
+            itviec.source.fetch_jobs()
+            employer_codes = itviec.source.get_employers_with_jobs()
+            download_employers(employer_codes)
+
+            counts = load_employers(employer_codes, batch_size=1)
+            self.assertEqual(counts, {"employers": 2, "jobs": 5, "reviews": 7})
+            rows = self.count_rows()
+
+            # Loading again updates the rows in place
+            load_employers(employer_codes)
+            self.assertEqual(self.count_rows(), rows)
+            self.assertEqual(rows["job"], 5)
+            self.assertEqual(rows["review"], 7)
+
+            for employer_code in employer_codes:
+                employer_d = itviec.cache.get_employer(employer_code)
+                employer = Employer.query.filter(Employer.code == employer_code).one()
+                self.assertEqual(employer.last_post, employer_d["last_post"])
+                self.assertEqual(sorted(tag.name for tag in employer.tags), sorted(set(employer_d["tags"])))
+                self.assertEqual(employer.reviews.count(), len(employer_d["reviews"]))
+                self.assertEqual(sorted(job.code for job in employer.jobs),
+                                 sorted(job_tag["code"] for job_tag in employer_d["jobs"]))
+
+                for job_tag in employer_d["jobs"]:
+                    job_d = itviec.cache.get_job(job_tag["code"])
+                    job = Job.query.filter(Job.code == job_tag["code"]).one()
+                    self.assertEqual(job.title, job_d["title"])
+                    self.assertEqual(sorted(address.full_address for address in job.addresses),
+                                     sorted(set(address for address in job_d["addresses"] if address)))
+
+    def test_old_sqlite(self):
+        from itviec.bulk import load_employers
+        from itviec.db import db
+
+        with self.app.app_context():
+            with mock.patch.object(db.engine.dialect.dbapi, "sqlite_version_info", (3, 22, 0)):
+                with self.assertRaisesRegex(RuntimeError, "sqlite 3.24.0 or newer"):
+                    load_employers(["acme-software"])
+
+
+if __name__ == '__main__':
+    unittest.main()
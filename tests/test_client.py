@@ -0,0 +1,129 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from itviec import create_app
+from tests.standin import StandInTestCase
+
+
+class ClientTestCase(StandInTestCase):
+
+    def test_conditional_get(self):
+        from itviec.client import get_client
+        from itviec.helpers import fetch_url
+
+        url = self.server.base_url + "/companies/acme-software"
+        with self.app.app_context():
+            first = fetch_url(url)
+            second = fetch_url(url)
+            stats = get_client().stats
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.text, first.text)
+        self.assertIn("employers_show", second.text)
+        self.assertEqual(stats["cache_miss"], 1)
+        self.assertEqual(stats["cache_not_modified"], 1)
+        self.assertEqual(stats["cache_saved_bytes"], len(first.content))
+
+    def test_json_from_cache(self):
+        from itviec.helpers import fetch_url
+
+        url = self.app.config["JOBS_URL"]
+        with self.app.app_context():
+            first = fetch_url(url)
+            second = fetch_url(url)
+
+        self.assertEqual(second.json(), first.json())
+
+    def test_offline_replay(self):
+        from itviec.archive import ArchiveMiss
+        from itviec.helpers import fetch_url
+
+        url = self.server.base_url + "/it-jobs/qa-engineer-acme-software-1236"
+        with self.app.app_context():
+            online = fetch_url(url)
+        self.server.stop()
+
+        offline_config = dict(self.app.config, HTTP_OFFLINE=True)
+        offline_app = create_app(profile="testing", test_config=offline_config)
+        with offline_app.app_context():
+            self.assertEqual(fetch_url(url).text, online.text)
+            with self.assertRaises(ArchiveMiss):
+                fetch_url(self.server.base_url + "/it-jobs/unknown")
+
+        self.server.start()
+
+    def test_token_bucket_rate(self):
+        from itviec.client import TokenBucket
+
+        clock = FakeClock()
+        with mock.patch("itviec.client.time", clock):
+            bucket = TokenBucket(rate=2, burst=3)
+            for _ in range(3 + 10):
+                bucket.acquire()
+
+        # The burst is free, then one request every 1 / rate seconds
+        self.assertAlmostEqual(clock.now, 10 / 2)
+
+    def test_retries_take_tokens(self):
+        from itviec.client import HttpClient, TokenBucket
+
+        class CountingBucket(TokenBucket):
+            acquired = 0
+
+            def acquire(self):
+                self.acquired += 1
+                super().acquire()
+
+        path = "/it-jobs/qa-engineer-acme-software-1236"
+        self.server.failures[path] = 2
+        bucket = CountingBucket(rate=1000, burst=1)
+        client = HttpClient(backoff_factor=0, limiter=bucket)
+
+        self.assertEqual(client.get(self.server.base_url + path).status_code, 200)
+        self.assertEqual(bucket.acquired, 3)
+
+    def test_one_client_per_app(self):
+        import itviec.client
+
+        make_client = itviec.client.make_client
+        barrier = threading.Barrier(4)
+        clients = []
+
+        def slow_make_client():
+            # Widen the window between the check and the assignment
+            time.sleep(0.05)
+            return make_client()
+
+        def start():
+            with self.app.app_context():
+                barrier.wait()
+                clients.append(itviec.client.get_client())
+
+        with mock.patch("itviec.client.make_client", slow_make_client):
+            threads = [threading.Thread(target=start) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(clients), 4)
+        self.assertTrue(all(client is clients[0] for client in clients))
+
+
+class FakeClock:
+    '''Stands in for the time module, sleep moves the clock forward'''
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+if __name__ == '__main__':
+    unittest.main()
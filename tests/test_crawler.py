@@ -0,0 +1,71 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+from tests.standin import StandInTestCase, replicate_routes
+
+
+class CrawlerTestCase(StandInTestCase):
+
+    def test_crawl_feed_and_jobs(self):
+        from itviec.crawler import FeedCrawler
+
+        import itviec.source
+
+        with self.app.app_context():
+            job_tags = FeedCrawler(workers=2, queue_size=2).run()
+            self.assertEqual(itviec.source.get_job_tags(), job_tags)
+
+        codes = [job_tag["code"] for job_tag in job_tags]
+        self.assertEqual(len(codes), 5)
+        self.assertEqual(codes[0], "senior-python-developer-acme-software-1234")
+
+        for code in codes:
+            path = os.path.join(self.app.config["JOBS_CACHE_DIR"], "{}.json".format(code))
+            with open(path, "r") as job_file:
+                job = json.load(job_file)
+            self.assertEqual(job["code"], code)
+            self.assertIn(job["employer_code"], ("acme-software", "blue-sky-tech"))
+
+    def test_crawl_skips_cached_jobs(self):
+        from itviec.crawler import FeedCrawler
+
+        with self.app.app_context():
+            FeedCrawler(workers=2).run()
+            requests_count = len(self.server.requests)
+
+            crawler = FeedCrawler(workers=2)
+            crawler.run()
+
+        self.assertEqual(crawler.downloaded, [])
+        self.assertEqual(len(self.server.requests) - requests_count, 2)
+
+    def test_crawl_replicated_site(self):
+        from itviec.crawler import FeedCrawler
+
+        self.server.pages = replicate_routes(3)
+        with self.app.app_context():
+            job_tags = FeedCrawler(workers=2).run()
+
+        codes = set(job_tag["code"] for job_tag in job_tags)
+        self.assertEqual(len(codes), 15)
+        self.assertIn("qa-engineer-acme-software-2-1236", codes)
+        self.assertEqual(set(job_tag["employer_code"] for job_tag in job_tags),
+                         {"acme-software-0", "acme-software-1", "acme-software-2",
+                          "blue-sky-tech-0", "blue-sky-tech-1", "blue-sky-tech-2"})
+
+    def test_crawl_raises_fetcher_error(self):
+        from itviec.crawler import FeedCrawler
+
+        def fail(job_code):
+            raise RuntimeError("fetch failed")
+
+        # Queues of one item would block the feed stages if the error was missed
+        with self.app.app_context(), mock.patch("itviec.cache.fetch_job", fail):
+            with self.assertRaises(RuntimeError):
+                FeedCrawler(workers=1, queue_size=1).run()
+
+
+if __name__ == '__main__':
+    unittest.main()
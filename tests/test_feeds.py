@@ -0,0 +1,43 @@
+import unittest
+
+from tests.standin import StandInTestCase
+
+
+class FeedsTestCase(StandInTestCase):
+
+    app_config = {"HTTP_CACHE": False}
+
+    def test_prefetch_job_pages(self):
+        from itviec.feeds import JobsFeed, PrefetchIterator
+
+        with self.app.app_context():
+            serial = [page.url for page in JobsFeed(prefetch=0)]
+            pages = JobsFeed(prefetch=2).pages()
+            prefetched = [page.url for page in pages]
+
+        self.assertIsInstance(pages, PrefetchIterator)
+        self.assertEqual(prefetched, serial)
+        self.assertEqual(len(prefetched), 2)
+
+    def test_prefetch_reviews(self):
+        from itviec.feeds import ReviewsFeed
+        from itviec.parsers import ReviewParser
+
+        with self.app.app_context():
+            serial = [ReviewParser(tag).get_dict() for tag in ReviewsFeed("acme-software", prefetch=0).reviews()]
+            prefetched = [ReviewParser(tag).get_dict() for tag in ReviewsFeed("acme-software", prefetch=1).reviews()]
+
+        self.assertEqual(prefetched, serial)
+        self.assertEqual(len(prefetched), 5)
+
+    def test_prefetch_error(self):
+        from itviec.feeds import ReviewsFeed
+
+        with self.app.app_context():
+            pages = ReviewsFeed("missing-employer", prefetch=1).pages()
+            with self.assertRaises(SystemExit):
+                next(pages)
+
+
+if __name__ == '__main__':
+    unittest.main()
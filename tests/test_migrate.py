@@ -0,0 +1,108 @@
+import json
+import tempfile
+import unittest
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from itviec import create_app
+from tests.standin import cache_config
+
+
+class MigrateDatesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.app = create_app(profile="testing", test_config=cache_config(self.cache_dir.name))
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def create_old_database(self, conn):
+        conn.execute(text("DROP INDEX ix_job_last_post"))
+        conn.execute(text(
+            "INSERT INTO employer (code, name, logo, location, industry, employees, country, "
+            "last_update, last_post, overview) VALUES ('acme-software', 'Acme Software', '', '', '', '', '', "
+            "'2020-01-09 08:30:00', '2020-01-10 08:15:00', '')"))
+        conn.execute(text(
+            "INSERT INTO job (code, title, salary, employer_code, last_update, last_post, description, "
+            "skills_experience, reasons) VALUES ('qa-engineer-acme-software-1236', 'QA Engineer', '', "
+            "'acme-software', '2020-01-10 10:16:00', '2020-01-07 10:16:00', '', '', '')"))
+        conn.execute(text(
+            "INSERT INTO review (title, date, employer_code, last_update, recommend, stars_total, "
+            "stars_salary, stars_training, stars_management, stars_culture, stars_workspace) VALUES "
+            "('Great place to grow', 'January 2020', 'acme-software', '2020-01-05 11:20:00 +0700', "
+            "1, 5, 5, 4, 5, 5, 4)"))
+
+    def test_migrate_dates(self):
+        from itviec.db import db
+        from itviec.migrate import migrate_dates
+        from itviec.models import Job, Review
+
+        with open(self.app.config["JOBS_JSON_FILE"], "w") as jobs_file:
+            json.dump([{"code": "qa-engineer-acme-software-1236", "employer_code": "acme-software",
+                        "last_update": "2020-01-10 10:16:00", "last_post": "2020-01-07 10:16:00"}], jobs_file)
+
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                self.create_old_database(conn)
+
+            migrate_dates()
+
+            job = db.session.query(Job).filter(Job.last_post < datetime(2020, 1, 8)).one()
+            self.assertEqual(job.last_update, datetime(2020, 1, 10, 10, 16))
+            review = db.session.query(Review).one()
+            self.assertEqual(review.date, datetime(2020, 1, 1))
+            self.assertEqual(review.last_update, datetime(2020, 1, 5, 11, 20))
+
+            indexes = [index["name"] for index in inspect(db.engine).get_indexes("job")]
+            self.assertIn("ix_job_last_post", indexes)
+
+        with open(self.app.config["JOBS_JSON_FILE"], "r") as jobs_file:
+            self.assertEqual(json.loads(jobs_file.readline())["last_post"], "2020-01-07T10:16:00")
+
+
+class MigrateSchemaTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.app = create_app(profile="testing", test_config=cache_config(self.cache_dir.name))
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_migrate_schema(self):
+        from itviec.db import db
+        from itviec.migrate import migrate_schema
+
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(text("DROP INDEX ix_job_employer_code"))
+                conn.execute(text("DROP TABLE job_tag"))
+                conn.execute(text("CREATE TABLE job_tag (job_id INTEGER, tag_id INTEGER)"))
+                conn.execute(text("INSERT INTO job_tag VALUES (1, 2), (1, 2), (1, 3), (2, 2), (3, NULL), (4, 2)"))
+                # Job 4 was deleted, its link is dropped
+                for job_id in (1, 2, 3):
+                    conn.execute(text(
+                        "INSERT INTO job (id, code, title, salary, employer_code, last_update, last_post, "
+                        "description, skills_experience, reasons) VALUES ({0}, 'job-{0}', '', '', 'acme-software', "
+                        "'2020-01-10 10:16:00', '2020-01-07 10:16:00', '', '', '')".format(job_id)))
+                for tag_id in (2, 3):
+                    conn.execute(text("INSERT INTO tag (id, name) VALUES ({0}, 'tag-{0}')".format(tag_id)))
+
+            migrate_schema()
+
+            inspector = inspect(db.engine)
+            self.assertEqual(inspector.get_pk_constraint("job_tag")["constrained_columns"], ["job_id", "tag_id"])
+            self.assertIn("ix_job_tag_tag_id", [index["name"] for index in inspector.get_indexes("job_tag")])
+            self.assertIn("ix_job_employer_code", [index["name"] for index in inspector.get_indexes("job")])
+            rows = db.session.execute(text("SELECT job_id, tag_id FROM job_tag ORDER BY job_id, tag_id"))
+            self.assertEqual([tuple(row) for row in rows], [(1, 2), (1, 3), (2, 2)])
+
+            # Migrated databases are left alone
+            migrate_schema()
+            self.assertEqual(db.session.execute(text("SELECT count(*) FROM job_tag")).scalar(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
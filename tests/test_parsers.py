@@ -0,0 +1,130 @@
+import json
+import unittest
+from datetime import datetime
+
+from itviec import create_app
+from tests.standin import load_routes, read_fixture
+
+BASE_URL = "https://itviec.com"
+
+
+def parse_fixtures():
+    '''Output of every parser for every recorded page'''
+    from itviec.feeds import build_job_page, build_review_page
+    from itviec.parsers import EmployerParser, JobParser, ReviewParser, parse_job_cards
+
+    results = {}
+    for path, (body, _) in sorted(load_routes().items()):
+        body = body.replace("{base_url}", BASE_URL)
+        url = BASE_URL + path
+        code = path.split("/")[2] if path.count("/") > 1 else None
+
+        if path.startswith("/it-jobs/"):
+            results[path] = JobParser(code).parse_job_page(body)
+        elif path.startswith("/it-jobs"):
+            page = build_job_page(url, json.loads(body))
+            results[path] = parse_job_cards(page.content) + [page.next_p]
+        elif "/review" in path:
+            page = build_review_page(url, body)
+            results[path] = [ReviewParser(review_tag).get_dict() for review_tag in page] + [page.next_p]
+        elif path.startswith("/companies/"):
+            results[path] = EmployerParser(code).parse_employer_page(body)
+    return results
+
+
+class ParserBackendsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(profile="testing", test_config={"SQLALCHEMY_ECHO": False, "BASE_URL": BASE_URL})
+
+    def parse_with(self, backend, parse_only=True):
+        self.app.config["HTML_PARSER"] = backend
+        self.app.config["HTML_PARSE_ONLY"] = parse_only
+        with self.app.app_context():
+            return parse_fixtures()
+
+    def test_html_parser(self):
+        results = self.parse_with("html.parser")
+
+        job = results["/it-jobs/senior-python-developer-acme-software-1234"]
+        self.assertEqual(job["employer_code"], "acme-software")
+        self.assertEqual(job["tags"], ["Python", "Django", "AWS"])
+        self.assertEqual(job["last_post"], datetime(2020, 1, 10, 8, 15))
+
+        employer = results["/companies/acme-software"]
+        self.assertEqual(employer["review_count"], 5)
+        self.assertEqual(len(employer["jobs"]), 3)
+        self.assertEqual(len(results["/companies/acme-software/review"]), 4)
+        self.assertEqual(len(results["/it-jobs"]), 4)
+
+    def test_backends_match(self):
+        from bs4.builder import builder_registry
+        from itviec.soup import BACKENDS
+
+        expected = self.parse_with("html.parser")
+        for backend in BACKENDS:
+            if builder_registry.lookup(backend) is None:
+                continue
+            with self.subTest(backend=backend):
+                results = self.parse_with(backend)
+                for path in expected:
+                    self.assertEqual(results[path], expected[path], path)
+
+    def test_parse_only_match(self):
+        from bs4.builder import builder_registry
+        from itviec.soup import BACKENDS
+
+        for backend in BACKENDS:
+            if builder_registry.lookup(backend) is None:
+                continue
+            with self.subTest(backend=backend):
+                self.assertEqual(self.parse_with(backend, parse_only=True), self.parse_with(backend, parse_only=False))
+
+    def test_read_fixture(self):
+        self.assertIn("jobs_show", read_fixture("job_qa-engineer-acme-software-1236.html"))
+
+
+class JobCardsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(profile="testing", test_config={"SQLALCHEMY_ECHO": False, "BASE_URL": BASE_URL})
+
+    def job_tag_parser(self, content):
+        from itviec.feeds import JobTagIterator
+        from itviec.parsers import JobTagParser
+
+        return [JobTagParser(job_tag).get_dict() for job_tag in JobTagIterator(content)]
+
+    def test_feed_pages_match_job_tag_parser(self):
+        from itviec.parsers import parse_job_cards
+
+        with self.app.app_context():
+            for path in ("/it-jobs", "/it-jobs?page=2"):
+                jobs_html = json.loads(load_routes()[path][0])["jobs_html"]
+                self.assertEqual(parse_job_cards(jobs_html), self.job_tag_parser(jobs_html), path)
+
+    def test_jobs_panel_matches_job_tag_parser(self):
+        from itviec.parsers import parse_job_cards
+        from itviec.soup import make_soup
+
+        html = read_fixture("employer_acme-software.html")
+        with self.app.app_context():
+            panel = make_soup(html).find("h3", string="Jobs").find_parent(class_="panel").find(class_="panel-body")
+            # JobTagParser takes the comments out of the tree
+            jobs = parse_job_cards(panel)
+            expected = self.job_tag_parser(panel)
+            self.assertEqual(len(expected), 3)
+            self.assertEqual(jobs, expected)
+
+    def test_comments_before_first_card_are_skipped(self):
+        from itviec.parsers import parse_job_cards
+
+        jobs_html = json.loads(load_routes()["/it-jobs"][0])["jobs_html"]
+        jobs_html = '<!-- Last updated: "2019-01-01 00:00:00 +0700" -->\n' + jobs_html
+        with self.app.app_context():
+            jobs = parse_job_cards(jobs_html)
+        self.assertEqual(jobs[0]["last_update"], datetime(2020, 1, 10, 10, 15))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import json
+import os
+import unittest
+
+from tests.standin import StandInTestCase
+
+
+class PipelineTestCase(StandInTestCase):
+
+    def download(self, parse_workers):
+        import itviec.source
+        from itviec.upgrade import download_employers, download_jobs
+
+        self.app.config["PARSE_WORKERS"] = parse_workers
+        self.app.config["PARSE_POOL_MIN_ITEMS"] = 0
+        with self.app.app_context():
+            itviec.source.fetch_jobs()
+            job_tags = itviec.source.get_job_tags()
+            download_jobs(job_tags)
+            download_employers(sorted({job_tag["employer_code"] for job_tag in job_tags}))
+
+        return self.read_cache("JOBS_CACHE_DIR"), self.read_cache("EMPLOYERS_CACHE_DIR")
+
+    def read_cache(self, setting):
+        directory = self.app.config[setting]
+        cache = {}
+        for filename in sorted(os.listdir(directory)):
+            with open(os.path.join(directory, filename), "r") as json_file:
+                cache[filename] = json.load(json_file)
+        return cache
+
+    def test_process_pool_matches_threads(self):
+        jobs, employers = self.download(parse_workers=2)
+
+        self.assertEqual(len(jobs), 5)
+        self.assertEqual(len(employers), 2)
+        self.assertEqual(len(employers["acme-software.json"]["reviews"]), 5)
+
+        self.assertEqual(self.download(parse_workers=0), (jobs, employers))
+
+
+if __name__ == '__main__':
+    unittest.main()
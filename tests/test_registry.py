@@ -0,0 +1,89 @@
+import tempfile
+import unittest
+from datetime import datetime
+
+from sqlalchemy import event
+
+from itviec import create_app
+from tests.standin import cache_config
+
+ADDRESS = "Floor 5, 123 Nguyen Hue, District 1, Ho Chi Minh"
+
+
+class RegistryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.app = create_app(profile="testing", test_config=cache_config(self.cache_dir.name))
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_registry(self):
+        from itviec.composers import str_to_address, str_to_tag
+        from itviec.db import db
+        from itviec.models import Address, Tag
+        from itviec.registry import get_registry
+
+        with self.app.app_context():
+            db.session.add(Tag(name="Python"))
+            db.session.add(Address(full_address=ADDRESS))
+            db.session.commit()
+
+            statements = []
+            listener = lambda *args: statements.append(args[2])  # noqa: E731
+            event.listen(db.engine, "before_cursor_execute", listener)
+            try:
+                items = [{"tags": ["Python", "Go"], "addresses": [ADDRESS, "", "Hanoi"]} for _ in range(50)]
+                for item in items:
+                    str_to_tag(item)
+                    str_to_address(item)
+            finally:
+                event.remove(db.engine, "before_cursor_execute", listener)
+
+            # One query per table, then no round trip at all
+            self.assertEqual(len(statements), 2)
+            self.assertTrue(all(item["tags"][1] is items[0]["tags"][1] for item in items))
+            self.assertEqual([address.full_address for address in items[0]["addresses"]], [ADDRESS, "Hanoi"])
+            self.assertEqual(items[0]["addresses"][1].city, "Hanoi")
+
+            db.session.commit()
+            self.assertEqual(sorted(tag.name for tag in Tag.query), ["Go", "Python"])
+            self.assertEqual(Address.query.count(), 2)
+
+            # New instances are forgotten with a rollback
+            registry = get_registry()
+            registry.tag("Rust")
+            db.session.rollback()
+            self.assertIsNone(registry.tags)
+            self.assertEqual(registry.tag("Go").name, "Go")
+            self.assertIsNone(Tag.query.filter_by(name="Rust").first())
+
+    def test_bulk_load(self):
+        from itviec.bulk import load_batch
+        from itviec.composers import str_to_address, str_to_tag
+        from itviec.db import db
+        from itviec.models import Address, Tag
+
+        employer = {"code": "acme-software", "name": "Acme Software", "logo": "", "location": "", "industry": "",
+                    "employees": "", "country": "", "last_update": datetime(2020, 1, 9), "overview": "",
+                    "last_post": datetime(2020, 1, 10), "why": {}, "tags": ["Python", "Go"],
+                    "addresses": [ADDRESS], "reviews": [], "jobs": []}
+
+        with self.app.app_context():
+            item = {"tags": ["Python"], "addresses": []}
+            str_to_tag(item)
+
+            # The registry learns about rows inserted by a bulk load
+            load_batch({employer["code"]: employer}, {})
+            item = {"tags": ["Python", "Go"], "addresses": [ADDRESS]}
+            str_to_tag(item)
+            str_to_address(item)
+            db.session.commit()
+
+            self.assertEqual(sorted(tag.name for tag in Tag.query), ["Go", "Python"])
+            self.assertEqual(Address.query.count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
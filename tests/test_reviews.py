@@ -0,0 +1,91 @@
+import json
+import os
+import unittest
+
+from tests.standin import StandInTestCase
+
+
+class IncrementalReviewsTestCase(StandInTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.app.config["EMPLOYERS_CACHE_DIR"], "acme-software.json")
+
+    def read_reviews(self):
+        with open(self.path, "r") as json_file:
+            return json.load(json_file)["reviews"]
+
+    def forget_newest_review(self):
+        with open(self.path, "r") as json_file:
+            employer = json.load(json_file)
+        employer["reviews"].pop(0)
+        with open(self.path, "w") as json_file:
+            json.dump(employer, json_file)
+
+    def review_requests(self, func):
+        start = len(self.server.requests)
+        with self.app.app_context():
+            func()
+        return [path for path in self.server.requests[start:] if "/review" in path]
+
+    def test_fetch_employer(self):
+        import itviec.cache
+
+        def fetch():
+            itviec.cache.fetch_employer("acme-software")
+
+        self.assertEqual(len(self.review_requests(fetch)), 2)
+        reviews = self.read_reviews()
+        self.assertEqual(len(reviews), 5)
+
+        self.forget_newest_review()
+        self.assertEqual(self.review_requests(fetch), ["/companies/acme-software/review"])
+        self.assertEqual(self.read_reviews(), reviews)
+
+    def test_download_employers(self):
+        from itviec.upgrade import download_employers
+
+        def download():
+            download_employers(["acme-software"])
+
+        self.assertEqual(len(self.review_requests(download)), 2)
+        reviews = self.read_reviews()
+
+        self.forget_newest_review()
+        self.assertEqual(self.review_requests(download), ["/companies/acme-software/review"])
+        self.assertEqual(self.read_reviews(), reviews)
+
+    def test_edited_review(self):
+        import itviec.cache
+
+        def fetch():
+            itviec.cache.fetch_employer("acme-software")
+
+        self.review_requests(fetch)
+        reviews = self.read_reviews()
+        self.assertIn("last_update", reviews[0])
+
+        # The cached copy predates an edit of the review on the site
+        with open(self.path, "r") as json_file:
+            employer = json.load(json_file)
+        employer["reviews"][0]["last_update"] = "2019-01-01T00:00:00"
+        employer["reviews"][0]["liked"] = "Old text"
+        with open(self.path, "w") as json_file:
+            json.dump(employer, json_file)
+
+        self.review_requests(fetch)
+        self.assertEqual(self.read_reviews(), reviews)
+
+    def test_full_crawl(self):
+        import itviec.cache
+
+        def fetch():
+            itviec.cache.fetch_employer("acme-software")
+
+        self.app.config["REVIEWS_INCREMENTAL"] = False
+        self.review_requests(fetch)
+        self.assertEqual(len(self.review_requests(fetch)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
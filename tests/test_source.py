@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from itviec import create_app
+from tests.standin import StandInTestCase, cache_config
+
+JOB_TAGS = [
+    {"code": "python-developer-acme-software-1234", "employer_code": "acme-software",
+     "last_update": "2020-01-10T10:15:00", "last_post": "2020-01-09T10:15:00"},
+    {"code": "qa-engineer-acme-software-1236", "employer_code": "acme-software",
+     "last_update": "2020-01-10T10:16:00", "last_post": "2020-01-10T08:16:00"},
+    {"code": "java-developer-globex-2345", "employer_code": "globex",
+     "last_update": "2020-01-10T10:17:00", "last_post": "2020-01-08T10:17:00"},
+]
+
+
+class FeedIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.app = create_app(profile="testing", test_config=cache_config(self.cache_dir.name))
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def write_feed(self, job_tags):
+        with open(self.app.config["JOBS_JSON_FILE"], "w") as jobs_file:
+            json.dump(job_tags, jobs_file)
+
+    def test_feed_index(self):
+        from itviec import source
+
+        self.write_feed(JOB_TAGS)
+        with self.app.app_context():
+            index = source.get_feed_index()
+            self.assertIs(source.get_feed_index(), index)
+
+            self.assertEqual(source.get_job_codes(), [job_tag["code"] for job_tag in JOB_TAGS])
+            self.assertEqual(source.get_employers_with_jobs(), ["acme-software", "globex"])
+            self.assertEqual(source.get_employer_feed_date("acme-software"), datetime(2020, 1, 10, 8, 16))
+            self.assertIsNone(source.get_employer_feed_date("initech"))
+            self.assertEqual(source.get_employer_job_codes("acme-software"),
+                             ["python-developer-acme-software-1234", "qa-engineer-acme-software-1236"])
+            self.assertEqual(source.get_employers_with_feed_date(), {
+                "acme-software": datetime(2020, 1, 10, 8, 16), "globex": datetime(2020, 1, 8, 10, 17)})
+            self.assertEqual(source.get_job_tags()[2]["last_post"], datetime(2020, 1, 8, 10, 17))
+
+            # A new feed file is indexed again
+            self.write_feed(JOB_TAGS[2:])
+            os.utime(self.app.config["JOBS_JSON_FILE"], ns=(0, 0))
+            self.assertIsNot(source.get_feed_index(), index)
+            self.assertEqual(source.get_employers_with_jobs(), ["globex"])
+
+
+class FeedSnapshotTestCase(StandInTestCase):
+
+    def interrupt_after_first_page(self):
+        from itviec import source
+        from itviec.crawler import fetch_page
+
+        snapshot = source.FeedSnapshotWriter(self.app.config["JOBS_JSON_FILE"])
+        snapshot.open()
+        page = fetch_page(self.app.config["JOBS_URL"])
+        snapshot.write_page(source.parse_job_cards(page.content), page.next_p)
+        # A partial page written before the crash is dropped on resume
+        snapshot.file.write(b'{"code": ')
+        snapshot.file.close()
+
+    def test_resume_fetch_jobs(self):
+        from itviec import source
+
+        with self.app.app_context():
+            source.fetch_jobs()
+            job_tags = source.get_job_tags()
+            with open(self.app.config["JOBS_JSON_FILE"], "r") as jobs_file:
+                self.assertEqual(len(jobs_file.readlines()), 5)
+
+            self.interrupt_after_first_page()
+            requests_count = len(self.server.requests)
+            source.fetch_jobs(resume=True)
+
+            self.assertEqual(len(self.server.requests) - requests_count, 1)
+            self.assertEqual(source.get_job_tags(), job_tags)
+            self.assertEqual(list(source.iter_job_tags()), job_tags)
+            self.assertFalse(os.path.exists(self.app.config["JOBS_JSON_FILE"] + ".resume"))
+
+    def test_resume_crawl(self):
+        from itviec import source
+        from itviec.crawler import FeedCrawler
+
+        with self.app.app_context():
+            self.interrupt_after_first_page()
+            crawler = FeedCrawler(workers=2, resume=True)
+            job_tags = crawler.run()
+
+            self.assertEqual(len(job_tags), 5)
+            self.assertEqual(sorted(crawler.downloaded), sorted(job_tag["code"] for job_tag in job_tags))
+            self.assertEqual(source.get_job_tags(), job_tags)
+
+    def test_legacy_snapshot(self):
+        from itviec import source
+
+        with open(self.app.config["JOBS_JSON_FILE"], "w") as jobs_file:
+            json.dump(JOB_TAGS, jobs_file, indent=2)
+
+        with self.app.app_context():
+            self.assertEqual([job_tag["code"] for job_tag in source.iter_job_tags()],
+                             [job_tag["code"] for job_tag in JOB_TAGS])
+
+
+if __name__ == '__main__':
+    unittest.main()
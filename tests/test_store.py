@@ -0,0 +1,161 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from itviec import create_app
+from tests.standin import cache_config
+
+JOB = {"code": "qa-engineer-acme-software-1236", "title": "QA Engineer",
+       "last_update": "2020-01-10T10:16:00", "last_post": "2020-01-07T10:16:00"}
+
+
+class StoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.app = create_app(profile="testing", test_config=cache_config(self.cache_dir.name))
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def check_store(self, backend):
+        from itviec.store import CacheMiss, make_store
+
+        with self.app.app_context():
+            store = make_store("jobs", backend)
+            other = make_store("employers", backend)
+
+            with self.assertRaises(CacheMiss):
+                store.get(JOB["code"])
+            self.assertNotIn(JOB["code"], store)
+
+            store.put(JOB["code"], JOB)
+            self.assertIn(JOB["code"], store)
+            self.assertNotIn(JOB["code"], other)
+            self.assertEqual(store.get(JOB["code"]), JOB)
+
+            items = {"job-{}".format(i): dict(JOB, code="job-{}".format(i)) for i in range(1200)}
+            store.put_many(items)
+            self.assertEqual(len(store.codes()), 1201)
+            self.assertEqual(store.get_many(list(items) + ["missing"]), items)
+
+            store.delete(JOB["code"])
+            self.assertNotIn(JOB["code"], store)
+
+    def test_directory_store(self):
+        self.check_store("directory")
+
+    def test_sqlite_store(self):
+        self.check_store("sqlite")
+
+    def test_encodings(self):
+        from itviec.encoding import ENCODINGS, decode, encode, get_encoding
+        from itviec.store import make_store
+
+        for encoding in ENCODINGS:
+            with self.subTest(encoding=encoding):
+                data = encode(JOB, get_encoding(encoding))
+                self.assertEqual(decode(data), JOB)
+                self.assertEqual(encode(JOB, get_encoding(encoding)), data)
+
+        with self.assertRaises(ValueError):
+            get_encoding("yaml")
+
+        # Legacy files and versioned ones are read back alike
+        self.app.config["CACHE_ENCODING"] = "json.gz"
+        with self.app.app_context():
+            with open(os.path.join(self.app.config["JOBS_CACHE_DIR"], "old-job.json"), "w") as json_file:
+                json.dump(dict(JOB, code="old-job"), json_file)
+
+            store = make_store("jobs", "directory")
+            store.put(JOB["code"], JOB)
+            with open(store.path(JOB["code"]), "rb") as gz_file:
+                self.assertTrue(gz_file.read().startswith(b"\x89ITV1 json.gz\n"))
+            self.assertEqual(store.get_many(["old-job", JOB["code"]]),
+                             {"old-job": dict(JOB, code="old-job"), JOB["code"]: JOB})
+
+    def test_index(self):
+        import itviec.cache
+        from itviec.store import get_store
+
+        feed_job = {"code": JOB["code"], "last_post": datetime(2020, 1, 8, 9, 0)}
+
+        with self.app.app_context():
+            # Items cached before the index existed are indexed on load
+            with open(os.path.join(self.app.config["JOBS_CACHE_DIR"], "old-job.json"), "w") as json_file:
+                json.dump(dict(JOB, code="old-job"), json_file)
+
+            store = get_store("jobs")
+            store.put(JOB["code"], JOB)
+            self.assertFalse(itviec.cache.is_job_cache_hit(dict(feed_job, code="missing")))
+            self.assertTrue(itviec.cache.is_job_cache_hit(feed_job))
+
+            entries = store.entries()
+            self.assertEqual(sorted(entries), ["old-job", JOB["code"]])
+            self.assertEqual(entries[JOB["code"]]["last_update"], datetime(2020, 1, 10, 10, 16))
+            self.assertEqual(entries[JOB["code"]]["size"], os.path.getsize(store.path(JOB["code"])))
+
+            store.put(JOB["code"], dict(JOB, last_post="2020-01-01T00:00:00"))
+            self.assertFalse(itviec.cache.is_job_cache_hit(feed_job))
+
+            store.delete("old-job")
+            self.assertEqual(list(store.entries()), [JOB["code"]])
+
+            # Entries are persistent and can be rebuilt
+            content_hash = entries[JOB["code"]]["hash"]
+            store.index.load()
+            self.assertEqual(store.entries()[JOB["code"]]["hash"], content_hash)
+            self.assertEqual(store.index.rebuild(store)[JOB["code"]]["hash"], content_hash)
+
+    def test_collect_garbage(self):
+        import itviec.cache
+        import itviec.source
+        from itviec.store import get_store
+
+        recent = datetime.now().isoformat()
+        listed = dict(JOB, employer_code="acme-software")
+        expired = dict(JOB, code="expired-job")
+        unlisted = dict(JOB, code="unlisted-job", last_post=recent)
+
+        with self.app.app_context():
+            itviec.source.write_job_tags([listed])
+            jobs = get_store("jobs")
+            jobs.put_many({job["code"]: job for job in (listed, expired, unlisted)})
+            get_store("employers").put("acme-software", {"code": "acme-software", "last_post": JOB["last_post"],
+                                                         "last_update": JOB["last_update"]})
+            entries = jobs.entries()
+
+            self.assertEqual(itviec.cache.collect_garbage(dry_run=True),
+                             {"jobs": (1, entries["expired-job"]["size"]), "employers": (0, 0)})
+            self.assertIn("expired-job", jobs)
+
+            itviec.cache.collect_garbage()
+            self.assertEqual(sorted(jobs.codes()), [JOB["code"], "unlisted-job"])
+
+            # Over the size budget, jobs missing from the feed go first
+            employer_size = get_store("employers").entries()["acme-software"]["size"]
+            itviec.cache.collect_garbage(max_size=entries[JOB["code"]]["size"] + employer_size)
+            self.assertEqual(jobs.codes(), [JOB["code"]])
+            self.assertIn("acme-software", get_store("employers"))
+
+    def test_migrate_cache(self):
+        import itviec.cache
+        from itviec.migrate import migrate_cache
+        from itviec.store import make_store
+
+        with self.app.app_context():
+            make_store("jobs", "directory").put(JOB["code"], JOB)
+            migrate_cache("directory", "sqlite")
+
+            self.app.config["CACHE_BACKEND"] = "sqlite"
+            self.app.extensions.pop("cache_stores", None)
+            self.assertTrue(itviec.cache.is_job_cached(JOB["code"]))
+            self.assertFalse(itviec.cache.is_employer_cached("acme-software"))
+            self.assertEqual(itviec.cache.get_job(JOB["code"])["last_post"], datetime(2020, 1, 7, 10, 16))
+            self.assertEqual(list(itviec.cache.get_jobs([JOB["code"], "missing"])), [JOB["code"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import itertools
+import unittest
+from unittest import mock
+
+from tests.standin import StandInTestCase
+
+
+class UpdateTestCase(StandInTestCase):
+
+    def load(self):
+        import itviec.source
+        from itviec.bulk import load_employers
+        from itviec.upgrade import download_employers
+
+        itviec.source.fetch_jobs()
+        employer_codes = itviec.source.get_employers_with_jobs()
+        download_employers(employer_codes)
+        load_employers(employer_codes)
+        return employer_codes
+
+    def change_cache(self, employer_code):
+        '''Add a tag to the cached employer and rename its first job'''
+        import itviec.cache
+        from itviec.store import get_store
+
+        employer = itviec.cache.get_employer(employer_code)
+        employer["tags"].append("Rust")
+        get_store("employers").put(employer_code, employer)
+
+        job = itviec.cache.get_job(employer["jobs"][0]["code"])
+        job["title"] = "Renamed " + job["title"]
+        get_store("jobs").put(job["code"], job)
+        return job
+
+    def test_update_employers(self):
+        from itviec.models import Employer, Job
+        from itviec.upgrade import update_employers
+
+        with self.app.app_context():
+            employer_codes = self.load()
+            jobs = [self.change_cache(employer_code) for employer_code in employer_codes]
+
+            uow = update_employers(employer_codes, commit_every=1)
+            self.assertEqual((uow.steps, uow.commits), (2, 2))
+
+            for employer_code, job in zip(employer_codes, jobs):
+                employer = Employer.query.filter(Employer.code == employer_code).one()
+                self.assertIn("Rust", [tag.name for tag in employer.tags])
+                self.assertEqual(Job.query.filter(Job.code == job["code"]).one().title, job["title"])
+
+            uow = update_employers(employer_codes, commit_every=0)
+            self.assertEqual((uow.steps, uow.commits), (2, 1))
+
+    def test_unit_of_work_stats(self):
+        from itviec.db import UnitOfWork, db
+        from itviec.models import Tag
+
+        with self.app.app_context():
+            clock = mock.patch("itviec.db.time.perf_counter", side_effect=itertools.count())
+            with clock, mock.patch("builtins.print") as print_mock, self.assertRaises(ValueError):
+                with UnitOfWork(db.session) as uow:
+                    db.session.add(Tag(name="Rust"))
+                    uow.step()
+                    # A flush inside a step, as bulk.load_batch runs
+                    db.session.flush()
+                    raise ValueError()
+
+            self.assertEqual(uow.flush_time, 1)
+            print_mock.assert_called_with("0 steps in 0 commits, 1.00s flushing, 0.00s committing.")
+            self.assertIsNone(Tag.query.filter(Tag.name == "Rust").first())
+
+    def test_purge_job(self):
+        import itviec.cache
+        from itviec.db import db
+        from itviec.models import Job, job_tag
+        from itviec.store import get_store
+        from itviec.upgrade import update_employers
+
+        with self.app.app_context():
+            self.load()
+            purged = Job.query.order_by(Job.id.desc()).first()
+            purged_id, purged_code, employer_code = purged.id, purged.code, purged.employer_code
+            employer = itviec.cache.get_employer(employer_code)
+            employer["jobs"] = [tag for tag in employer["jobs"] if tag["code"] != purged_code]
+            get_store("employers").put(employer_code, employer)
+            update_employers([employer_code])
+
+            self.assertIsNone(Job.query.filter(Job.code == purged_code).first())
+            links = db.session.execute(job_tag.select().where(job_tag.c.job_id == purged_id)).fetchall()
+            self.assertEqual(links, [])
+
+            # A new job with the same tags takes the free id
+            job = itviec.cache.get_job(purged_code)
+            job["code"] = "new-" + job["code"]
+            get_store("jobs").put(job["code"], job)
+            employer["jobs"].append({"code": job["code"], "last_update": job["last_update"],
+                                     "last_post": job["last_post"]})
+            get_store("employers").put(employer_code, employer)
+            update_employers([employer_code])
+
+            new_job = Job.query.filter(Job.code == job["code"]).one()
+            self.assertEqual(new_job.id, purged_id)
+            self.assertEqual(sorted(tag.name for tag in new_job.tags), sorted(set(job["tags"])))
+
+    def test_rollback_batch(self):
+        import itviec.update
+        from itviec.models import Job
+        from itviec.upgrade import update_employers
+
+        with self.app.app_context():
+            employer_codes = self.load()
+            jobs = [self.change_cache(employer_code) for employer_code in employer_codes]
+
+            def fail_second(employer_code):
+                itviec.update.update_employer(employer_code)
+                if employer_code == employer_codes[1]:
+                    raise RuntimeError("update failed")
+
+            with mock.patch("itviec.upgrade.update_employer", fail_second):
+                with self.assertRaises(RuntimeError):
+                    update_employers(employer_codes, commit_every=1)
+
+            # The first employer was committed before the failure
+            titles = [Job.query.filter(Job.code == job["code"]).one().title for job in jobs]
+            self.assertEqual(titles[0], jobs[0]["title"])
+            self.assertNotEqual(titles[1], jobs[1]["title"])
+
+
+if __name__ == '__main__':
+    unittest.main()
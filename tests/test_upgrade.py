@@ -0,0 +1,69 @@
+import tempfile
+import unittest
+from datetime import datetime
+
+from itviec import create_app
+from tests.standin import cache_config
+
+OLD = datetime(2020, 1, 6, 8, 15)
+NEW = datetime(2020, 1, 10, 8, 15)
+
+
+def employer_row(code, last_post):
+    return {"code": code, "name": code, "logo": "", "location": "", "industry": "", "employees": "",
+            "country": "", "last_update": last_post, "last_post": last_post, "overview": ""}
+
+
+def job_row(code, employer_code, last_post):
+    return {"code": code, "title": code, "salary": "", "employer_code": employer_code, "last_update": last_post,
+            "last_post": last_post, "description": "", "skills_experience": "", "reasons": ""}
+
+
+def job_tag(code, employer_code, last_post):
+    return {"code": code, "employer_code": employer_code, "last_update": last_post, "last_post": last_post}
+
+
+class UpgradePlanTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.app = create_app(profile="testing", test_config=cache_config(self.cache_dir.name))
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_plan(self):
+        import itviec.source
+        from itviec.db import db
+        from itviec.models import Employer, Job
+        from itviec.upgrade import _add_employers_from_jobs, calculate_employer_upgrades, calculate_job_upgrades
+
+        feed_jobs = [
+            job_tag("up-to-date", "acme", OLD),
+            job_tag("posted-again", "acme", NEW),
+            job_tag("new-job", "globex", OLD),
+            job_tag("new-employer-job", "initech", NEW),
+            job_tag("new-job-2", "globex", OLD),
+        ]
+
+        with self.app.app_context():
+            itviec.source.write_job_tags(feed_jobs)
+            db.engine.execute(Employer.__table__.insert(), [
+                employer_row("acme", OLD), employer_row("globex", OLD), employer_row("umbrella", OLD)])
+            db.engine.execute(Job.__table__.insert(), [
+                job_row("up-to-date", "acme", OLD), job_row("posted-again", "acme", OLD),
+                job_row("expired", "umbrella", OLD)])
+
+            feed_jobs = itviec.source.get_job_tags()
+            jobs = calculate_job_upgrades(feed_jobs)
+            employers = calculate_employer_upgrades(feed_jobs)
+            _add_employers_from_jobs(employers, jobs)
+
+        self.assertEqual([job["code"] for job in jobs["create"]], ["new-job", "new-employer-job", "new-job-2"])
+        self.assertEqual([job["code"] for job in jobs["update"]], ["posted-again"])
+        self.assertEqual(jobs["delete"], ["expired"])
+        self.assertEqual(employers, {"create": ["initech"], "update": ["acme", "globex"], "delete": ["umbrella"]})
+
+
+if __name__ == '__main__':
+    unittest.main()
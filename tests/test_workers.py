@@ -0,0 +1,38 @@
+import tempfile
+import threading
+import unittest
+
+from itviec import create_app
+from tests.standin import cache_config
+
+
+class WorkersTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.app = create_app(profile="testing", test_config=cache_config(self.cache_dir.name))
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_worker_error_reaches_caller(self):
+        from itviec.workers import run_concurrently
+
+        done = []
+        lock = threading.Lock()
+
+        def work(item):
+            if item == 3:
+                raise ValueError("item {} failed".format(item))
+            with lock:
+                done.append(item)
+
+        with self.app.app_context():
+            with self.assertRaisesRegex(ValueError, "item 3 failed"):
+                run_concurrently(work, list(range(10)), "items", workers=2)
+
+        self.assertNotIn(3, done)
+
+
+if __name__ == '__main__':
+    unittest.main()